@@ -0,0 +1,23 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+'''
+Organize ROMs from a flat directory to nested folders.
+
+One engine runs the removal phases and bucketing for every platform.
+The platforms differ only by their profile (see profiles.py).
+'''
+
+__author__ = 'Steven Ward'
+__version__ = '2026-10-18'
+__license__ = 'OSL-3.0'
+
+from .engine import Plan, Rules, get_rules, organize, scan
+from .profiles import PROFILES, Profile, get_profile
+
+def __getattr__(name):
+    # apply is imported when apply_plan is used, so a run that only prints a script does not import it.
+    if name == 'apply_plan':
+        from .apply import apply_plan # pylint: disable=import-outside-toplevel
+        return apply_plan
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
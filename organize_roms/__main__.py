@@ -0,0 +1,11 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=missing-module-docstring
+
+import sys
+
+from .cli import main
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,252 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+
+'''
+Carry out a plan in this process.
+
+A plan is turned into a list of operations, each relative to an open file descriptor of the ROMs directory,
+so no path is resolved more than once and no process is spawned:
+('unlink', name), ('rename', old name, new name), ('mkdir', dir name), ('move', name, dir name).
+With a quarantine directory (see quarantine.py), a removed file is moved into it instead: ('quarantine', name, dir name).
+Re-bucketing (see rebucket.py) renames paths between buckets and removes the buckets it empties: ('rmdir', dir name).
+
+With a journal (see journal.py), the operations are recorded before they are carried out,
+so an interrupted run can be resumed or undone.
+
+On a network filesystem (NFS, SMB), every operation is a round trip to the server,
+so the operations can be overlapped by a pool of threads, in the order their paths need.
+'''
+
+import os
+
+from .engine import Plan
+
+def open_dir(path, dir_fd = None) -> int:
+    '''Open the directory and return its file descriptor.'''
+    return os.open(path, os.O_RDONLY | os.O_DIRECTORY | os.O_CLOEXEC, dir_fd=dir_fd)
+
+def operations(plan: Plan, quarantine_dir = None) -> list:
+    '''Get the operations of the plan, in the order of the shell script.'''
+
+    ops = []
+
+    for deletion in plan.deletions:
+        if quarantine_dir is None:
+            ops.extend(('unlink', name) for name in deletion.names)
+        else:
+            ops.extend(('quarantine', name, quarantine_dir) for name in deletion.names)
+
+    ops.extend(('rename', old_name, new_name) for (old_name, new_name) in plan.renames)
+
+    for (dir_name, names) in plan.moves.items():
+        ops.append(('mkdir', dir_name))
+        ops.extend(('move', name, dir_name) for name in names)
+
+    return ops
+
+# operation to the key of counts
+count_keys = {'unlink': 'removed', 'quarantine': 'removed', 'rename': 'renamed', 'move': 'moved'}
+
+def target(op: tuple) -> str:
+    '''Get the path (relative to the ROMs directory) that the operation creates (None for unlink).'''
+    (kind, *args) = op
+    if kind == 'rename':
+        return args[1]
+    if kind in ('move', 'quarantine'):
+        return os.path.join(args[1], args[0])
+    if kind == 'mkdir':
+        return args[0]
+    return None
+
+def is_done(op: tuple, dir_fd: int) -> bool:
+    '''Check if the operation was already carried out (e.g. before an interruption).'''
+
+    (kind, *args) = op
+
+    def exists(path):
+        try:
+            os.stat(path, dir_fd=dir_fd, follow_symlinks=False)
+            return True
+        except FileNotFoundError:
+            return False
+
+    if kind == 'mkdir':
+        return exists(args[0])
+
+    if kind == 'rmdir':
+        return not exists(args[0])
+
+    if exists(args[0]):
+        return False
+
+    return kind == 'unlink' or exists(target(op))
+
+def run_operation(op: tuple, dir_fd: int, log = None) -> None:
+    '''Carry out the operation in the ROMs directory.'''
+
+    (kind, *args) = op
+
+    if kind == 'unlink':
+        os.unlink(args[0], dir_fd=dir_fd)
+        if log is not None:
+            log(f'removed {args[0]!r}')
+
+    elif kind == 'rename':
+        os.rename(args[0], args[1], src_dir_fd=dir_fd, dst_dir_fd=dir_fd)
+        if log is not None:
+            log(f'renamed {args[0]!r} -> {args[1]!r}')
+
+    elif kind == 'mkdir':
+        try:
+            os.mkdir(args[0], dir_fd=dir_fd)
+            if log is not None:
+                log(f'created directory {args[0]!r}')
+        except FileExistsError:
+            pass
+
+    elif kind == 'rmdir':
+        try:
+            os.rmdir(args[0], dir_fd=dir_fd)
+            if log is not None:
+                log(f'removed directory {args[0]!r}')
+        except OSError:
+            # not empty
+            pass
+
+    elif kind == 'move':
+        os.rename(args[0], target(op), src_dir_fd=dir_fd, dst_dir_fd=dir_fd)
+        if log is not None:
+            log(f'renamed {args[0]!r} -> {target(op)!r}')
+
+    elif kind == 'quarantine':
+        os.rename(args[0], target(op), src_dir_fd=dir_fd, dst_dir_fd=dir_fd)
+        if log is not None:
+            log(f'quarantined {args[0]!r} -> {target(op)!r}')
+
+    else:
+        raise ValueError(f'Unknown operation: {kind!r}')
+
+def keys(op: tuple) -> tuple:
+    '''Get the paths (relative to the ROMs directory) that the operation changes, and the directories it works in.'''
+
+    (kind, *args) = op
+
+    if kind in ('unlink', 'mkdir', 'rmdir'):
+        return ((args[0],), ())
+
+    paths = (args[0], args[1] if kind == 'rename' else target(op))
+
+    return (paths, tuple(filter(None, map(os.path.dirname, paths))))
+
+def run_operations(ops, path = '.', log = None, journal = None, start: int = 0, resuming: bool = False, jobs: int = 1) -> dict:
+    '''Carry out the operations (from index start) in the ROMs directory.
+
+    With jobs > 1, the operations are carried out by a pool of threads, to hide the latency of a network filesystem.
+    An operation waits for the earlier operations on the same paths,
+    a move waits for the mkdir of its bucket, and an rmdir waits for every operation in its directory;
+    other operations overlap.
+    With a journal, the progress is committed in batches (only up to the first operation not yet carried out).
+    When resuming, an operation that was already carried out is skipped.
+    Stop at the first error, like the shell script.
+    Return the number of files removed, renamed and moved.
+    '''
+
+    counts = {'removed': 0, 'renamed': 0, 'moved': 0}
+
+    dir_fd = open_dir(path)
+
+    def run(i, deps = ()):
+        for dep in deps:
+            # raises if the operation it waits for failed
+            dep.result()
+        op = ops[i]
+        if not resuming or not is_done(op, dir_fd):
+            run_operation(op, dir_fd, log)
+
+    def finish(i):
+        op = ops[i]
+        if op[0] in count_keys:
+            counts[count_keys[op[0]]] += 1
+        if journal is not None:
+            journal.progress(i + 1, dir_fd)
+
+    try:
+        if jobs <= 1:
+            for i in range(start, len(ops)):
+                run(i)
+                finish(i)
+        else:
+            # imported here: it imports logging, which would slow down the start of every run
+            import concurrent.futures # pylint: disable=import-outside-toplevel
+            with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+                futures = {}
+                # path to the future of the last operation on it
+                last = {}
+                # directory to the futures of the operations in it
+                inside = {}
+                for i in range(start, len(ops)):
+                    (paths, dirs) = keys(ops[i])
+                    deps = {last[key] for key in paths + dirs if key in last}
+                    if ops[i][0] == 'rmdir':
+                        deps.update(inside.pop(ops[i][1], ()))
+                    # The queue of the executor is FIFO, so every dependency is running or done before its dependent starts.
+                    future = executor.submit(run, i, deps)
+                    futures[future] = i
+                    for key in paths:
+                        last[key] = future
+                    for dir_name in dirs:
+                        inside.setdefault(dir_name, []).append(future)
+                finished = set()
+                next_i = start
+                error = None
+                pending = set(futures)
+                try:
+                    while pending: # not empty
+                        (done, pending) = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                        for future in done:
+                            if future.cancelled():
+                                continue
+                            if future.exception() is not None:
+                                # Let the running operations finish, so the progress before the error is recorded.
+                                if error is None:
+                                    error = future.exception()
+                                    executor.shutdown(wait=False, cancel_futures=True)
+                                continue
+                            finished.add(futures[future])
+                        while next_i in finished:
+                            finished.remove(next_i)
+                            finish(next_i)
+                            next_i += 1
+                        # A future cancelled before it started never completes, so it is not waited for.
+                        pending = {future for future in pending if not future.cancelled()}
+                except BaseException:
+                    executor.shutdown(cancel_futures=True)
+                    raise
+                if error is not None:
+                    raise error
+    finally:
+        if journal is not None:
+            journal.commit(dir_fd)
+        os.close(dir_fd)
+
+    return counts
+
+def apply_plan(plan: Plan, path = '.', log = None, journal = None, quarantine_dir = None, jobs: int = 1) -> dict:
+    '''Carry out the plan in the ROMs directory.
+
+    log is called with a message for every operation (or is None).
+    If quarantine_dir (relative to the ROMs directory) is not None, the removed files are moved into it.
+    jobs is the number of threads (see run_operations).
+    Stop at the first error, like the shell script.
+    Return the number of files removed, renamed and moved.
+    '''
+
+    ops = operations(plan, quarantine_dir)
+
+    if journal is not None:
+        journal.begin(os.path.realpath(path), ops)
+
+    return run_operations(ops, path, log, journal, jobs=jobs)
@@ -0,0 +1,199 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+
+'''
+Usage: python3 -m organize_roms.batch [--apply] [--jobs N] [--catalog FILE] COLLECTION_DIR
+
+Organize every ROMs directory of a collection, one process per directory.
+
+A ROMs directory is a directory named after the No-Intro set of a platform
+(e.g. "Nintendo - Nintendo Entertainment System (Headered) (20230318-071435)")
+directly in COLLECTION_DIR or one level below it (e.g. in "Nintendo - NES").
+
+Without --apply, print one shell script that organizes every ROMs directory.
+A summary of each directory is printed to stderr.
+
+Examples:
+python3 -m organize_roms.batch <base-path-to-roms> > organize.sh
+python3 -m organize_roms.batch --apply --jobs 4 <base-path-to-roms>
+'''
+
+import argparse
+import concurrent.futures
+import io
+import os
+from shlex import quote
+import sqlite3
+import sys
+import time
+
+from .apply import apply_plan
+from .catalog import Catalog
+from .engine import organize, rules_for, scan
+from .profiles import PROFILES, get_profile
+from .shell import write_shell
+from .zips import inner_names, is_zip, zip_classifier
+
+def match_profile(dir_name: str):
+    '''Get the name of the profile whose set name is the longest prefix of the directory name (None if none).'''
+
+    best = None
+
+    for profile in PROFILES.values():
+        if dir_name == profile.set_name or dir_name.startswith(profile.set_name + ' '):
+            if best is None or len(profile.set_name) > len(best.set_name):
+                best = profile
+
+    return None if best is None else best.name
+
+def find_roms_dirs(collection_dir) -> list:
+    '''Get the (profile name, path) of the ROMs directories in the collection, sorted by path.
+
+    A directory is looked into even if its name matches a set,
+    because the ROMs directories are often kept in a directory of the same name
+    (e.g. "Nintendo - Game Boy/Nintendo - Game Boy (20230318-071435)").
+    '''
+
+    def visit(path, depth) -> list:
+        roms_dirs = []
+        with os.scandir(path) as it:
+            for entry in it:
+                if not entry.is_dir(follow_symlinks=False):
+                    continue
+                sub_roms_dirs = visit(entry.path, depth - 1) if depth > 0 else []
+                if sub_roms_dirs: # not empty
+                    roms_dirs.extend(sub_roms_dirs)
+                    continue
+                profile_name = match_profile(entry.name)
+                if profile_name is not None:
+                    roms_dirs.append((profile_name, entry.path))
+        return roms_dirs
+
+    return sorted(visit(collection_dir, 1), key=lambda roms_dir: roms_dir[1])
+
+def organize_dir(profile_name: str, path: str, apply: bool, catalog_path = None) -> tuple:
+    '''Organize one ROMs directory (in a worker process).
+
+    Return the summary and the shell script (None with apply).
+    '''
+
+    start = time.perf_counter()
+
+    profile = get_profile(profile_name)
+
+    if catalog_path is None:
+        names = scan(path)
+        classify = None
+        if any(is_zip(name) for name in names):
+            classify = zip_classifier(rules_for(profile).buckets, profile.rom_ext, inner_names(path, names, profile.rom_ext))
+        plan = organize(names, profile, classify)
+    else:
+        with Catalog(catalog_path) as catalog:
+            plan = catalog.plan(path, profile)
+
+    summary = {
+            'platform': profile_name,
+            'path': path,
+            'removed': sum(len(deletion.names) for deletion in plan.deletions),
+            'renamed': len(plan.renames),
+            'moved': sum(len(names) for names in plan.moves.values()),
+            'unplaced': len(plan.unplaced),
+            }
+
+    script = None
+
+    if apply:
+        apply_plan(plan, path)
+    else:
+        f = io.StringIO()
+        write_shell(plan, f)
+        script = f.getvalue()
+
+    summary['seconds'] = time.perf_counter() - start
+
+    return (summary, script)
+
+def parse_args(argv):
+    '''Parse the command line arguments.'''
+
+    parser = argparse.ArgumentParser(
+            prog='organize_roms.batch',
+            description='Organize every ROMs directory of a collection.')
+
+    parser.add_argument('collection_dir',
+            help='directory that contains the ROMs directories')
+
+    parser.add_argument('--apply', action='store_true',
+            help='organize the ROMs instead of printing a shell script')
+
+    parser.add_argument('-j', '--jobs', type=int, default=None, metavar='N',
+            help='number of worker processes (default: the number of CPUs)')
+
+    parser.add_argument('--catalog', metavar='FILE',
+            help='SQLite catalog for incremental runs')
+
+    return parser.parse_args(argv)
+
+# pylint: disable=missing-function-docstring
+def main(argv = None):
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    args = parse_args(argv)
+
+    roms_dirs = find_roms_dirs(args.collection_dir)
+
+    if not roms_dirs: # empty
+        print(f'Error: No ROMs directories found in {quote(args.collection_dir)}', file=sys.stderr)
+        return 1
+
+    max_workers = min(len(roms_dirs), args.jobs or os.cpu_count() or 1)
+
+    results = {}
+    errors = 0
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+                executor.submit(organize_dir, profile_name, path, args.apply, args.catalog): path
+                for (profile_name, path) in roms_dirs}
+        for future in concurrent.futures.as_completed(futures):
+            path = futures[future]
+            try:
+                results[path] = future.result()
+            except (OSError, ValueError, sqlite3.Error) as e:
+                # e.g. a shared catalog locked by another writer; the other directories go on
+                print(f'Error: {quote(path)}: {e}', file=sys.stderr)
+                errors += 1
+
+    totals = {'removed': 0, 'renamed': 0, 'moved': 0, 'unplaced': 0}
+
+    if not args.apply:
+        print('#!/usr/bin/sh')
+
+    for (_, path) in roms_dirs:
+        if path not in results:
+            continue
+        (summary, script) = results[path]
+        for key in totals:
+            totals[key] += summary[key]
+        print(f"# {summary['platform']:<6} {summary['removed']:>6} removed {summary['renamed']:>6} renamed "
+                f"{summary['moved']:>6} moved {summary['unplaced']:>6} unplaced {summary['seconds']:>7.3f} s {quote(path)}",
+                file=sys.stderr)
+        if script is not None:
+            print()
+            print(f'( cd -- {quote(path)} || exit')
+            # skip the shebang
+            print(script.partition('\n')[2], end='')
+            print(') || exit')
+
+    print(f"# total  {totals['removed']:>6} removed {totals['renamed']:>6} renamed "
+            f"{totals['moved']:>6} moved {totals['unplaced']:>6} unplaced", file=sys.stderr)
+
+    return 1 if errors else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
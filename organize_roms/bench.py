@@ -0,0 +1,319 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+
+'''
+Usage: python3 -m organize_roms.bench [--synthetic COUNT...] [--no-fixtures] [--apply] [--jobs N...] [--latency MS] [--repeat N] [--json FILE] [--compare FILE]
+
+Benchmark the organizer.
+
+The inputs are the roms-list/* files (one per platform)
+and synthetic No-Intro-style names (--synthetic, e.g. 10000 100000 1000000).
+For each input, print the time of each phase, of writing the shell script,
+and (with --apply) of carrying out the plan on empty files in a temporary directory (on tmpfs if possible).
+The throughput is in names per second; the peak memory is measured with tracemalloc in a separate run.
+
+With --jobs, the plan is carried out once for each number of threads (apply-jN).
+With --latency, every rename, unlink, mkdir and rmdir first sleeps MS milliseconds (without holding the GIL),
+like a round trip to a network filesystem, so the speedup of the threads can be measured on a local disk.
+
+Results can be saved as JSON and compared with a previous run.
+
+Examples:
+python3 -m organize_roms.bench --json bench-before.json
+python3 -m organize_roms.bench --synthetic 10000 1000000 --compare bench-before.json
+python3 -m organize_roms.bench --no-fixtures --synthetic 10000 --apply --jobs 1 4 16 64 --latency 2 --repeat 1
+'''
+
+import argparse
+import contextlib
+import io
+import json
+import os
+from pathlib import Path
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from .apply import apply_plan
+from .engine import organize
+from .names import parse
+from .profiles import get_profile
+from .shell import write_shell
+from .stats import Stats
+
+roms_list_dir = Path(__file__).resolve().parent.parent / 'roms-list'
+
+# profile name to roms-list file
+fixtures = {
+        'gb'     : 'Nintendo-Game-Boy',
+        'gbc'    : 'Nintendo-Game-Boy-Color',
+        'nes'    : 'Nintendo-Nintendo-Entertainment-System-headered',
+        'snes'   : 'Nintendo-Super-Nintendo-Entertainment-System',
+        '32x'    : 'Sega-32X',
+        'gg'     : 'Sega-Game-Gear',
+        'ms-m3'  : 'Sega-Master-System-Mark-III',
+        'md-gen' : 'Sega-Mega-Drive-Genesis',
+        }
+
+words = '''
+action adventure alien alpha arcade baseball battle blade blaster bomber boxing castle champion chase
+chronicles city combat commando contra cosmic crystal cyber dark death defender demon dragon dream
+dungeon eagle empire escape fantasy fighter fire force fortress galaxy ghost golden golf grand guardian
+hero hockey hunter island jungle karate kid king knight labyrinth land legend magic master mega metal
+mission monster moon mystery night ninja operation paradise phantom pinball planet power prince puzzle
+quest racer racing raider rally rescue return revenge robot rocket saga samurai secret shadow shooter
+soccer space speed spirit star storm street strike super sword tales tank tennis thunder tiger titan
+tower turbo ultra valley warrior wars wizard world wrestling zero
+'''.split()
+
+# (tag, weight); most names have one of the kept regions
+regions = (
+        ('USA', 30),
+        ('Europe', 20),
+        ('Japan', 25),
+        ('World', 5),
+        ('USA, Europe', 8),
+        ('Japan, USA', 3),
+        ('Japan, Europe', 2),
+        ('Germany', 2),
+        ('France', 2),
+        ('Korea', 1),
+        ('Brazil', 1),
+        ('Asia', 1),
+        )
+
+dev_statuses = ('Beta', 'Proto', 'Demo', 'Sample', 'Beta 2', 'Proto 1')
+
+def synthetic_names(count: int, rom_ext: str = 'nes', seed: int = 0) -> list:
+    '''Generate count unique No-Intro-style names.
+
+    Most titles are released in more than one region, so the superseding phases have work to do.
+    '''
+
+    rng = random.Random(seed)
+    region_tags = [tag for (tag, _) in regions]
+    region_weights = [weight for (_, weight) in regions]
+
+    names = set()
+
+    while len(names) < count:
+
+        title = ' '.join(rng.choice(words).capitalize() for _ in range(rng.randint(1, 4)))
+        if rng.random() < 0.2:
+            title += ' ' + str(rng.randint(2, 99))
+        if rng.random() < 0.05:
+            title = title.replace(' ', '.', 1)
+
+        for region in rng.sample(region_tags, k=rng.randint(1, 3), counts=region_weights):
+            tags = [f'({region})']
+            if rng.random() < 0.15:
+                tags.append('(En,Fr,De)')
+            if rng.random() < 0.1:
+                tags.append(f'(Rev {rng.randint(1, 3)})')
+            if rng.random() < 0.05:
+                tags.append(f'({rng.choice(dev_statuses)})')
+            if rng.random() < 0.02:
+                tags.append('[b]')
+            prefix = '[BIOS] ' if rng.random() < 0.001 else ''
+            names.add(f'{prefix}{title} {" ".join(tags)}.{rom_ext}')
+
+    return sorted(names)[:count]
+
+def load_fixture(profile_name: str) -> list:
+    '''Get the names of the roms-list file of the profile.'''
+    with open(roms_list_dir / fixtures[profile_name], encoding='utf-8') as f:
+        return f.read().splitlines()
+
+def tmp_dir() -> str:
+    '''Get a directory for temporary files, on tmpfs if possible.'''
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return None
+
+# the os functions that carry out the operations of a plan (see apply.py)
+latency_functions = ('rename', 'unlink', 'mkdir', 'rmdir')
+
+@contextlib.contextmanager
+def injected_latency(seconds: float):
+    '''Make every call of the functions in latency_functions sleep for seconds first.'''
+
+    if not seconds:
+        yield
+        return
+
+    originals = {name: getattr(os, name) for name in latency_functions}
+
+    def delayed(function):
+        def call(*args, **kwargs):
+            time.sleep(seconds)
+            return function(*args, **kwargs)
+        return call
+
+    for (name, function) in originals.items():
+        setattr(os, name, delayed(function))
+
+    try:
+        yield
+    finally:
+        for (name, function) in originals.items():
+            setattr(os, name, function)
+
+def run_once(names: list, profile_name: str, apply: bool, jobs = (1,), latency: float = 0.0) -> dict:
+    '''Run the organizer once. Return the seconds of each phase.'''
+
+    profile = get_profile(profile_name)
+
+    # Start each run with a cold parser.
+    parse.cache_clear()
+
+    stats = Stats()
+
+    start = time.perf_counter()
+    plan = organize(names, profile, stats=stats)
+
+    with stats.phase('output', len(names)):
+        write_shell(plan, io.StringIO())
+
+    seconds = {record['phase']: record['seconds'] for record in stats.phases}
+    seconds['total'] = time.perf_counter() - start
+
+    if apply:
+        for n in jobs:
+            with tempfile.TemporaryDirectory(prefix='organize-roms-bench.', dir=tmp_dir()) as path:
+                for name in names:
+                    with open(os.path.join(path, name), 'xb'):
+                        pass
+                with injected_latency(latency):
+                    start = time.perf_counter()
+                    apply_plan(plan, path, jobs=n)
+                    seconds['apply' if jobs == (1,) else f'apply-j{n}'] = time.perf_counter() - start
+
+    return seconds
+
+def peak_memory(names: list, profile_name: str) -> int:
+    '''Get the peak memory (bytes) allocated by one run.'''
+
+    parse.cache_clear()
+
+    tracemalloc.start()
+    try:
+        plan = organize(names, get_profile(profile_name))
+        write_shell(plan, io.StringIO())
+        (_, peak) = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return peak
+
+def bench(label: str, names: list, profile_name: str, apply: bool, repeat: int, jobs = (1,), latency: float = 0.0) -> dict:
+    '''Benchmark one input. The time of each phase is the best of the repeats.'''
+
+    best = {}
+
+    for _ in range(repeat):
+        for (key, seconds) in run_once(names, profile_name, apply, jobs, latency).items():
+            best[key] = min(seconds, best.get(key, seconds))
+
+    return {
+            'input': label,
+            'platform': profile_name,
+            'names': len(names),
+            'seconds': best,
+            'names_per_second': len(names) / best['total'] if best['total'] else None,
+            'peak_bytes': peak_memory(names, profile_name),
+            }
+
+def print_result(result: dict, previous = None) -> None:
+    '''Print one result (and the ratio to the previous result of the same input).'''
+
+    phases = ' '.join(f'{key}={seconds * 1000:.1f}ms' for (key, seconds) in result['seconds'].items())
+    line = (f"{result['input']:<46} {result['names']:>8} names "
+            f"{result['names_per_second']:>12,.0f} names/s {result['peak_bytes'] / 2**20:>8.1f} MiB  {phases}")
+
+    if previous is not None:
+        line += f"  (total x{result['seconds']['total'] / previous['seconds']['total']:.2f} of previous)"
+
+    print(line)
+
+def parse_args(argv):
+    '''Parse the command line arguments.'''
+
+    parser = argparse.ArgumentParser(
+            prog='organize_roms.bench',
+            description='Benchmark the organizer.')
+
+    parser.add_argument('--synthetic', type=int, nargs='*', default=[10_000, 100_000], metavar='COUNT',
+            help='numbers of synthetic names (default: %(default)s)')
+
+    parser.add_argument('--no-fixtures', action='store_true',
+            help='do not benchmark the roms-list files')
+
+    parser.add_argument('--apply', action='store_true',
+            help='also carry out the plan on empty files')
+
+    parser.add_argument('--jobs', type=int, nargs='+', default=[1], metavar='N',
+            help='with --apply, numbers of threads to carry out the plan with (default: %(default)s)')
+
+    parser.add_argument('--latency', type=float, default=0.0, metavar='MS',
+            help='with --apply, milliseconds of latency injected into each file operation (default: %(default)s)')
+
+    parser.add_argument('--repeat', type=int, default=3, metavar='N',
+            help='take the best of N runs (default: %(default)s)')
+
+    parser.add_argument('--json', metavar='FILE',
+            help='save the results as JSON')
+
+    parser.add_argument('--compare', metavar='FILE',
+            help='compare with the results saved in FILE')
+
+    return parser.parse_args(argv)
+
+# pylint: disable=missing-function-docstring
+def main(argv = None):
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    args = parse_args(argv)
+
+    previous = {}
+    if args.compare is not None:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = {result['input']: result for result in json.load(f)['results']}
+
+    inputs = []
+
+    if not args.no_fixtures:
+        for profile_name in fixtures:
+            inputs.append((fixtures[profile_name], profile_name, lambda profile_name=profile_name: load_fixture(profile_name)))
+
+    for count in args.synthetic:
+        inputs.append((f'synthetic-{count}', 'nes', lambda count=count: synthetic_names(count)))
+
+    results = []
+
+    for (label, profile_name, load) in inputs:
+        result = bench(label, load(), profile_name, args.apply, args.repeat, tuple(args.jobs), args.latency / 1000)
+        print_result(result, previous.get(label))
+        results.append(result)
+
+    if args.json is not None:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                    'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                    'python': platform.python_version(),
+                    'machine': platform.machine(),
+                    'results': results,
+                    }, f, indent=1)
+            print(file=f)
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
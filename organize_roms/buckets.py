@@ -0,0 +1,107 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+
+'''
+Classify file names into the buckets of a profile.
+
+The bucket tables are written as find(1) patterns (-iname globs or -iregex POSIX extended regexes),
+so the shell script and the Python classifier agree on where each file goes.
+Here they are translated once to Python regexes, compiled when the first name is classified
+(a run with nothing to classify compiles none).
+'''
+
+import functools
+import re
+
+from .profiles import Profile
+
+# POSIX character classes used by the bucket tables, as Python character classes
+posix_classes = {
+        '[^[:alnum:]]' : r'[\W_]',
+        '[[:alnum:]]'  : r'[^\W_]',
+        }
+
+def translate_find_regex(pattern: str) -> str:
+    '''Translate a find -regextype posix-extended regex to a Python regex.'''
+
+    for (posix_class, python_class) in posix_classes.items():
+        pattern = pattern.replace(posix_class, python_class)
+
+    if '[:' in pattern:
+        raise ValueError(f'Unsupported POSIX character class in {pattern!r}')
+
+    return pattern
+
+def translate_find_glob(pattern: str) -> str:
+    '''Translate a find -iname glob to a Python regex.
+
+    Unlike fnmatch.translate, a backslash escapes the next character.
+    '''
+
+    result = []
+    i = 0
+    n = len(pattern)
+
+    while i < n:
+        c = pattern[i]
+        i += 1
+        if c == '\\' and i < n:
+            result.append(re.escape(pattern[i]))
+            i += 1
+        elif c == '*':
+            result.append('.*')
+        elif c == '?':
+            result.append('.')
+        elif c == '[':
+            j = pattern.find(']', i + 1 if pattern[i:i+1] in ('!', '^') else i)
+            if j == -1:
+                result.append(r'\[')
+                continue
+            chars = pattern[i:j]
+            i = j + 1
+            if chars[0] in ('!', '^'):
+                chars = '^' + chars[1:]
+            result.append('[' + chars.replace('\\', '\\\\') + ']')
+        else:
+            result.append(re.escape(c))
+
+    return ''.join(result)
+
+class Buckets:
+    '''The compiled bucket table of a profile.'''
+
+    def __init__(self, profile: Profile):
+
+        self.dir_names = tuple(profile.dir_name_to_pattern.keys())
+
+        if profile.bucket_match == 'iname':
+            # find -iname matches the base name
+            self.prefix = ''
+            translate = translate_find_glob
+        elif profile.bucket_match == 'iregex':
+            # find -iregex matches the whole path
+            self.prefix = './'
+            translate = translate_find_regex
+        else:
+            raise ValueError(f'Unknown bucket match: {profile.bucket_match!r}')
+
+        self.regexes = tuple((dir_name, translate(pattern)) for (dir_name, pattern) in profile.dir_name_to_pattern.items())
+
+    @functools.cached_property
+    def matchers(self) -> tuple:
+        '''The directory name and the fullmatch function of each bucket.'''
+        return tuple((dir_name, re.compile(regex, re.IGNORECASE | re.DOTALL).fullmatch) for (dir_name, regex) in self.regexes)
+
+    def classify(self, name: str):
+        '''Get the directory name of the first bucket that matches the name (None if no bucket matches).'''
+
+        path = self.prefix + name
+
+        for (dir_name, fullmatch) in self.matchers:
+            if fullmatch(path):
+                return dir_name
+
+        return None
@@ -0,0 +1,173 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+
+'''
+Usage: python3 -m organize_roms.build [--output FILE] [--python INTERPRETER] [--compress] [--repeat N] [--top N] [--budget MS]
+
+Build a single-file zipapp of the organizer, then measure how fast it starts.
+
+The archive holds the organize_roms package and a __main__.py that runs python3 -m organize_roms.
+Every module (the platform rule tables of profiles.py included) is stored precompiled:
+its .pyc sits next to its .py, where zipimport looks for it, as an unchecked hash-based .pyc,
+so nothing is compiled or stat'ed at start-up.
+A different Python version ignores the .pyc files and runs the sources.
+
+The modules of the other modes (--apply, --journal, --watch, ...) are imported when the mode is used,
+and the bucket regexes are compiled when the first name is classified (see buckets.py),
+so a run with nothing to do only imports what it needs.
+
+After the build, the archive is run on an empty ROMs directory:
+once with python3 -X importtime, to print the total import time and the slowest imports,
+and --repeat times, to print the best wall time of a run with nothing to do.
+With --budget, the build fails if that wall time is over MS milliseconds.
+
+Examples:
+python3 -m organize_roms.build
+python3 -m organize_roms.build --output ~/bin/organize-roms --python '/usr/bin/env python3' --budget 100
+organize-roms --apply --verbose gb <base-path-to-roms>/'Nintendo - Game Boy'
+'''
+
+import argparse
+from pathlib import Path
+import py_compile
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipapp
+
+package_dir = Path(__file__).resolve().parent
+
+main_source = '''\
+import sys
+
+from organize_roms.cli import main
+
+sys.exit(main())
+'''
+
+def stage(staging_dir: Path) -> None:
+    '''Copy the package and the __main__.py of the archive into the staging directory, and precompile them.'''
+
+    target_dir = staging_dir / package_dir.name
+    target_dir.mkdir()
+
+    sources = [staging_dir / '__main__.py']
+    sources[0].write_text(main_source, encoding='utf-8')
+
+    for source in sorted(package_dir.glob('*.py')):
+        sources.append(Path(shutil.copy2(source, target_dir)))
+
+    for source in sources:
+        # zipimport only finds a .pyc next to its .py (not in __pycache__)
+        py_compile.compile(source, cfile=source.with_suffix('.pyc'), doraise=True,
+                invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH)
+
+def build(output, interpreter = None, compressed: bool = False) -> None:
+    '''Build the zipapp.'''
+
+    with tempfile.TemporaryDirectory() as staging_dir:
+        stage(Path(staging_dir))
+        zipapp.create_archive(staging_dir, output, interpreter=interpreter, compressed=compressed)
+
+def import_times(archive, roms_dir) -> list:
+    '''Run the archive on the ROMs directory with -X importtime.
+
+    Return the (self, cumulative) microseconds and the name of every module imported.
+    '''
+
+    proc = subprocess.run([sys.executable, '-X', 'importtime', archive, 'nes', roms_dir],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+
+    result = []
+
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line.removeprefix('import time:').split('|')
+        if not fields[0].strip().isdigit():
+            # the header
+            continue
+        result.append((int(fields[0]), int(fields[1]), fields[2].rstrip()))
+
+    return result
+
+def best_time(archive, roms_dir, repeat: int) -> float:
+    '''Get the best wall time (in seconds) of running the archive on the ROMs directory.'''
+
+    best = float('inf')
+
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, archive, 'nes', roms_dir],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        best = min(best, time.perf_counter() - t0)
+
+    return best
+
+def parse_args(argv):
+    '''Parse the command line arguments.'''
+
+    parser = argparse.ArgumentParser(
+            prog='organize_roms.build',
+            description='Build a single-file zipapp of the organizer and measure its start-up.')
+
+    parser.add_argument('-o', '--output', default='organize-roms.pyz', metavar='FILE',
+            help='the archive to write (default: %(default)s)')
+
+    parser.add_argument('-p', '--python', metavar='INTERPRETER',
+            help='the interpreter of the shebang line of the archive, e.g. "/usr/bin/env python3" (default: no shebang line)')
+
+    parser.add_argument('-c', '--compress', action='store_true',
+            help='compress the archive (smaller, slightly slower to start)')
+
+    parser.add_argument('--repeat', type=int, default=10, metavar='N',
+            help='the number of runs to time (default: %(default)s)')
+
+    parser.add_argument('--top', type=int, default=10, metavar='N',
+            help='the number of slowest imports to print (default: %(default)s)')
+
+    parser.add_argument('--budget', type=float, metavar='MS',
+            help='fail if a run with nothing to do takes longer than MS milliseconds')
+
+    return parser.parse_args(argv)
+
+# pylint: disable=missing-function-docstring
+def main(argv = None):
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    args = parse_args(argv)
+
+    try:
+        build(args.output, args.python, args.compress)
+        print(f'Built {args.output}', file=sys.stderr)
+
+        with tempfile.TemporaryDirectory() as roms_dir:
+            imports = import_times(args.output, roms_dir)
+            wall_time = best_time(args.output, roms_dir, max(args.repeat, 1))
+    except (OSError, py_compile.PyCompileError, subprocess.CalledProcessError) as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+
+    total = sum(self_us for (self_us, _, _) in imports)
+    print(f'{len(imports)} modules imported in {total / 1000:.1f} ms', file=sys.stderr)
+
+    for (self_us, cumulative_us, name) in sorted(imports, reverse=True)[:args.top]:
+        print(f'{self_us / 1000:8.2f} ms self {cumulative_us / 1000:8.2f} ms cumulative  {name.strip()}', file=sys.stderr)
+
+    print(f'A run with nothing to do takes {wall_time * 1000:.1f} ms (best of {max(args.repeat, 1)})', file=sys.stderr)
+
+    if args.budget is not None and wall_time * 1000 > args.budget:
+        print(f'Error: over the budget of {args.budget:g} ms', file=sys.stderr)
+        return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,223 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+
+'''
+A persistent catalog of ROMs directories, for incremental runs.
+
+For each directory the catalog stores its mtime and, for each file,
+its size, mtime, parsed tags, bucket and the decision of the last run
+(and for a zip archive, the name of the ROM inside it, so the archive is not opened again).
+
+If the mtime of the directory has not changed, no file was added, removed or renamed,
+so the stored plan is reused without reading the directory.
+Otherwise the directory is scanned again, and only new or changed files are classified.
+'''
+
+import hashlib
+import os
+import sqlite3
+import time
+
+from . import __version__
+from .engine import Deletion, Plan, organize, rules_for
+from .names import parse
+from .profiles import Profile
+from .zips import inner_names, is_zip, zip_classifier
+
+schema = '''
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    -- comments of the deletions of the plan, one per line
+    comments TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    directory TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    tags TEXT NOT NULL,
+    bucket TEXT,
+    -- 'delete', 'rename', 'move' or 'stay'
+    decision TEXT NOT NULL,
+    -- for 'delete', the index of the deletion in the plan; for 'rename', the new name
+    detail TEXT,
+    -- for a zip archive, the name of the ROM inside it (NULL if it cannot be read)
+    inner_name TEXT,
+    PRIMARY KEY (directory, name)
+) WITHOUT ROWID;
+'''
+
+# A directory mtime this close to the time of the scan may hide a later change within the same tick.
+racy_ns = 2_000_000_000
+
+def fingerprint(profile: Profile) -> str:
+    '''Get a string that changes whenever the rules of the profile (or this package) change.'''
+    return hashlib.sha1(f'{__version__} {profile!r}'.encode()).hexdigest()
+
+def scan_stat(path) -> dict:
+    '''Get the (size, mtime_ns) of each file in the path.'''
+
+    files = {}
+
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_file(follow_symlinks=False):
+                st = entry.stat(follow_symlinks=False)
+                files[entry.name] = (st.st_size, st.st_mtime_ns)
+
+    return files
+
+class Catalog:
+    '''The catalog database.'''
+
+    def __init__(self, db_path):
+        self.connection = sqlite3.connect(db_path)
+        self.connection.executescript(schema)
+        # a catalog made before the inner names were stored
+        columns = {column[1] for column in self.connection.execute('PRAGMA table_info(files)')}
+        if 'inner_name' not in columns:
+            with self.connection:
+                self.connection.execute('ALTER TABLE files ADD COLUMN inner_name TEXT')
+
+    def close(self) -> None:
+        '''Close the database.'''
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def plan(self, path, profile: Profile) -> Plan:
+        '''Get the plan for the ROMs directory, reusing the catalog where it is still valid.'''
+
+        directory = os.path.realpath(path)
+        fp = fingerprint(profile)
+
+        # Stat the directory before reading it, so a change during the scan is seen by the next run.
+        dir_mtime_ns = os.stat(directory).st_mtime_ns
+        if time.time_ns() - dir_mtime_ns < racy_ns:
+            dir_mtime_ns = -1
+
+        row = self.connection.execute(
+                'SELECT mtime_ns, fingerprint FROM directories WHERE path = ?',
+                (directory,)).fetchone()
+
+        if row is not None and row[1] == fp and row[0] == dir_mtime_ns != -1:
+            return self.load(directory, profile)
+
+        files = scan_stat(directory)
+
+        # name to bucket, by the name that is classified (the new name of a renamed file)
+        known_buckets = {}
+        # zip archive to the name of the ROM inside it (see zips.py)
+        inner = {}
+        if row is not None and row[1] == fp:
+            for (name, size, mtime_ns, bucket, decision, detail, inner_name) in self.connection.execute(
+                    'SELECT name, size, mtime_ns, bucket, decision, detail, inner_name FROM files WHERE directory = ?',
+                    (directory,)):
+                if files.get(name) != (size, mtime_ns):
+                    continue
+                if is_zip(name):
+                    inner[name] = inner_name
+                # A deleted file was never classified (its bucket is NULL).
+                if decision != 'delete':
+                    known_buckets[detail if decision == 'rename' else name] = bucket
+
+        new_zips = [name for name in files if is_zip(name) and name not in inner]
+        if new_zips: # not empty
+            inner.update(inner_names(directory, new_zips, profile.rom_ext))
+
+        zip_classify = zip_classifier(rules_for(profile).buckets, profile.rom_ext, inner)
+
+        def classify(name):
+            try:
+                return known_buckets[name]
+            except KeyError:
+                return zip_classify(name)
+
+        plan = organize(files.keys(), profile, classify)
+
+        self.store(directory, fp, dir_mtime_ns, files, plan, inner)
+
+        return plan
+
+    def store(self, directory: str, fp: str, dir_mtime_ns: int, files: dict, plan: Plan, inner: dict) -> None:
+        '''Replace the stored plan of the directory (and the inner names of its zip archives).'''
+
+        decisions = {}
+
+        for (i, deletion) in enumerate(plan.deletions):
+            for name in deletion.names:
+                decisions[name] = (None, 'delete', str(i))
+
+        renamed = {}
+        for (old_name, new_name) in plan.renames:
+            renamed[new_name] = old_name
+
+        for (dir_name, names) in plan.moves.items():
+            for name in names:
+                old_name = renamed.get(name)
+                if old_name is None:
+                    decisions[name] = (dir_name, 'move', None)
+                else:
+                    decisions[old_name] = (dir_name, 'rename', name)
+
+        for name in plan.unplaced:
+            old_name = renamed.get(name)
+            if old_name is None:
+                decisions[name] = (None, 'stay', None)
+            else:
+                decisions[old_name] = (None, 'rename', name)
+
+        with self.connection:
+            self.connection.execute('DELETE FROM files WHERE directory = ?', (directory,))
+            self.connection.executemany(
+                    'INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    ((directory, name, size, mtime_ns, '\n'.join(parse(name).tags)) + decisions[name] + (inner.get(name),)
+                    for (name, (size, mtime_ns)) in files.items()))
+            self.connection.execute(
+                    'INSERT OR REPLACE INTO directories VALUES (?, ?, ?, ?)',
+                    (directory, dir_mtime_ns, fp, '\n'.join(deletion.comment for deletion in plan.deletions)))
+
+    def load(self, directory: str, profile: Profile) -> Plan:
+        '''Rebuild the stored plan of the directory.'''
+
+        plan = Plan(profile)
+
+        (comments,) = self.connection.execute(
+                'SELECT comments FROM directories WHERE path = ?',
+                (directory,)).fetchone()
+        plan.deletions = [Deletion(comment, []) for comment in comments.split('\n') if comment]
+
+        plan.moves = {dir_name: [] for dir_name in rules_for(profile).buckets.dir_names}
+
+        for (name, bucket, decision, detail) in self.connection.execute(
+                'SELECT name, bucket, decision, detail FROM files WHERE directory = ? ORDER BY name',
+                (directory,)):
+            if decision == 'delete':
+                plan.deletions[int(detail)].names.append(name)
+                continue
+            if not parse(name).bios:
+                plan.kept.add(name)
+            if decision == 'rename':
+                plan.renames.append((name, detail))
+                name = detail
+            if bucket is None:
+                plan.unplaced.append(name)
+            else:
+                plan.moves.setdefault(bucket, []).append(name)
+
+        for deletion in plan.deletions:
+            deletion.names.sort()
+        for names in plan.moves.values():
+            names.sort()
+        plan.unplaced.sort()
+
+        return plan
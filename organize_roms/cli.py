@@ -0,0 +1,289 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+
+'''
+Usage: python3 -m organize_roms [--apply | --watch] [--verbose] [--catalog FILE] [--stats] [--stats-json FILE] [--names FILE [-0]] [--layout FILE] [--journal FILE] [--quarantine] [--jobs N] [--save-plan FILE] PLATFORM [ROMS_DIR]
+
+Print a shell script that organizes the ROMs in ROMS_DIR (default: the current directory).
+Review the script, then run it from within the ROMs directory.
+
+With --apply, organize the ROMs directly instead of printing a script.
+
+With --apply --journal, record the operations in a journal first,
+to resume the run if it is interrupted or to undo it (see python3 -m organize_roms.journal).
+If the journal has an interrupted run of the same directory, that run is resumed instead.
+
+With --apply --quarantine, move the removed files into .quarantine/RUN in ROMS_DIR instead of deleting them,
+and report the bytes and inodes of each phase (see python3 -m organize_roms.quarantine).
+
+With --apply --jobs N, carry out the operations in N threads, to hide the round trips of a network filesystem (NFS, SMB).
+
+With --watch, organize the ROMs directly, then keep organizing new files as they land (Linux only).
+
+With --names, plan against a listing of file names instead of reading ROMS_DIR:
+newline-delimited (e.g. roms-list/Nintendo-Game-Boy) or, with -0, NUL-delimited (find -print0).
+FILE - is stdin.
+
+A zip archive (one ROM per zip) goes into the bucket of the ROM inside it;
+only the central directory of the archive is read.
+
+With --save-plan, save the plan to a file instead of printing a script,
+to compare or apply it later (see python3 -m organize_roms.planfile).
+
+With --layout, use the bucket table of a layout file (see python3 -m organize_roms.layout) instead of the one in profiles.py.
+
+With --stats (or --stats-json), report the wall time, names in and out, matches per rule
+and peak RSS of each phase. --trace-memory adds the peak memory allocated in each phase (slow),
+and --profile saves a cProfile of the run.
+
+With --catalog, keep the plan in an SQLite file and reuse it while the ROMs directory is unchanged.
+
+Examples:
+python3 -m organize_roms nes > organize.sh
+python3 -m organize_roms md-gen <base-path-to-roms>/'Sega - Mega Drive - Genesis' > organize.sh
+python3 -m organize_roms --apply --verbose nes <base-path-to-roms>/'Nintendo - NES'
+python3 -m organize_roms --names roms-list/Nintendo-Game-Boy gb > organize.sh
+ssh nas find /roms/gb -maxdepth 1 -type f -print0 | python3 -m organize_roms --names - -0 gb > organize.sh
+'''
+
+import argparse
+import contextlib
+import os
+import sys
+
+from .engine import organize, rules_for, scan
+from .listing import open_listing, read_names
+from .profiles import PROFILES, get_profile
+from .shell import write_shell
+from .stats import Stats, phase
+from .zips import inner_names, is_zip, zip_classifier
+
+# pylint: disable=import-outside-toplevel
+# The modules of the other modes (apply, catalog, journal, layout, planfile, quarantine, watch)
+# are imported when the mode is used, so a plain run starts fast (see build.py).
+
+def parse_args(argv):
+    '''Parse the command line arguments.'''
+
+    parser = argparse.ArgumentParser(
+            prog='organize_roms',
+            description='Organize ROMs from a flat directory to nested folders.')
+
+    parser.add_argument('platform', choices=PROFILES.keys(),
+            help='platform profile')
+
+    parser.add_argument('roms_dir', nargs='?', default='.',
+            help='directory of ROMs (default: %(default)s)')
+
+    mode = parser.add_mutually_exclusive_group()
+
+    mode.add_argument('--apply', action='store_true',
+            help='organize the ROMs instead of printing a shell script')
+
+    mode.add_argument('--watch', action='store_true',
+            help='organize the ROMs, then organize new files as they land')
+
+    parser.add_argument('--debounce', type=float, default=1.0, metavar='SECONDS',
+            help='with --watch, wait for this quiet period after new files (default: %(default)s)')
+
+    parser.add_argument('-v', '--verbose', action='store_true',
+            help='with --apply or --watch, print every operation to stderr')
+
+    parser.add_argument('--catalog', metavar='FILE',
+            help='SQLite catalog for incremental runs')
+
+    parser.add_argument('--names', metavar='FILE',
+            help='read the file names from a listing (- for stdin) instead of ROMS_DIR')
+
+    parser.add_argument('-0', '--null', action='store_true',
+            help='with --names, the names are NUL-delimited instead of newline-delimited')
+
+    parser.add_argument('--layout', metavar='FILE',
+            help='use the bucket table of the layout file')
+
+    parser.add_argument('--journal', metavar='FILE',
+            help='with --apply, journal the operations in FILE (or resume the run in FILE)')
+
+    parser.add_argument('--quarantine', action='store_true',
+            help='with --apply, move the removed files into a quarantine directory instead of deleting them')
+
+    parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+            help='with --apply, the number of threads that carry out the operations, e.g. 16 on a network filesystem (default: %(default)s)')
+
+    parser.add_argument('--save-plan', metavar='FILE',
+            help='save the plan to FILE instead of printing a shell script')
+
+    parser.add_argument('--stats', action='store_true',
+            help='print the measurements of each phase to stderr')
+
+    parser.add_argument('--stats-json', metavar='FILE',
+            help='write the measurements of each phase as JSON to FILE')
+
+    parser.add_argument('--trace-memory', action='store_true',
+            help='with --stats or --stats-json, also measure the memory allocated in each phase (slow)')
+
+    parser.add_argument('--profile', metavar='FILE',
+            help='save a cProfile of the run to FILE (see python3 -m pstats)')
+
+    args = parser.parse_args(argv)
+
+    if args.names is not None and (args.watch or args.catalog is not None):
+        parser.error('--names cannot be used with --watch or --catalog')
+
+    if args.journal is not None and not args.apply:
+        parser.error('--journal needs --apply')
+
+    if args.quarantine and not args.apply:
+        parser.error('--quarantine needs --apply')
+
+    if args.save_plan is not None and (args.apply or args.watch):
+        parser.error('--save-plan cannot be used with --apply or --watch')
+
+    return args
+
+def log_stderr(message: str) -> None:
+    '''Print the message to stderr.'''
+    print(message, file=sys.stderr)
+
+# pylint: disable=missing-function-docstring
+def main(argv = None):
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    args = parse_args(argv)
+
+    profile = get_profile(args.platform)
+
+    if args.layout is not None:
+        try:
+            from .layout import load_layout
+            profile = load_layout(profile, args.layout)
+        except (OSError, ValueError, KeyError) as e:
+            print(f'Error: {e}', file=sys.stderr)
+            return 1
+
+    if args.watch:
+        try:
+            from .watch import Watcher
+            Watcher(args.roms_dir, profile, log_stderr if args.verbose else None).run(args.debounce)
+        except KeyboardInterrupt:
+            pass
+        except OSError as e:
+            print(f'Error: {e}', file=sys.stderr)
+            return 1
+        return 0
+
+    stats = None
+    if args.stats or args.stats_json is not None:
+        stats = Stats(args.trace_memory)
+
+    profiler = None
+    if args.profile is not None:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    try:
+        status = run(args, profile, stats)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+
+    if stats is not None:
+        if args.stats:
+            stats.write_text(sys.stderr)
+        if args.stats_json is not None:
+            stats.write_json(args.stats_json)
+
+    return status
+
+def resume_journal(args) -> int:
+    '''Resume the interrupted run of the ROMs directory in the journal.'''
+
+    from .journal import Journal, resume
+
+    try:
+        with Journal.load(args.journal) as journal:
+            if journal.state != 'running' or journal.roms_dir != os.path.realpath(args.roms_dir):
+                print(f'Error: The journal {args.journal} exists and has no interrupted run of {args.roms_dir}', file=sys.stderr)
+                return 1
+            log_stderr(f'Resuming the run in {args.journal} at operation {journal.committed + 1} of {len(journal.ops)}')
+            counts = resume(journal, log_stderr if args.verbose else None, args.jobs)
+    except (OSError, ValueError) as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+
+    if args.verbose:
+        log_stderr(', '.join(f'{count} {key}' for (key, count) in counts.items()))
+
+    return 0
+
+def run(args, profile, stats) -> int:
+    '''Plan, then apply the plan or write the shell script.'''
+
+    if args.journal is not None and os.path.exists(args.journal):
+        return resume_journal(args)
+
+    buckets = rules_for(profile).buckets
+
+    if args.names is not None:
+        # The names are parsed as they are read.
+        with open_listing(args.names) as f:
+            plan = organize(read_names(f, args.null), profile, zip_classifier(buckets, profile.rom_ext), stats)
+    elif args.catalog is None:
+        with phase(stats, 'scan') as record:
+            names = scan(args.roms_dir)
+            record['names_out'] = len(names)
+        classify = None
+        if any(is_zip(name) for name in names):
+            with phase(stats, 'zip') as record:
+                inner = inner_names(args.roms_dir, names, profile.rom_ext)
+                record['names_out'] = len(inner)
+            classify = zip_classifier(buckets, profile.rom_ext, inner)
+        plan = organize(names, profile, classify, stats)
+    else:
+        from .catalog import Catalog
+        with Catalog(args.catalog) as catalog:
+            with phase(stats, 'catalog'):
+                plan = catalog.plan(args.roms_dir, profile)
+
+    if args.save_plan is not None:
+        from .planfile import save_plan
+        try:
+            save_plan(plan, args.save_plan)
+        except OSError as e:
+            print(f'Error: {e}', file=sys.stderr)
+            return 1
+    elif args.apply:
+        from .apply import apply_plan
+        from .journal import Journal
+        from .quarantine import prepare, write_usage
+        with phase(stats, 'apply') as record:
+            try:
+                quarantine_dir = None
+                if args.quarantine and plan.deletions: # not empty
+                    (quarantine_dir, usage) = prepare(plan, args.roms_dir)
+                with contextlib.ExitStack() as stack:
+                    journal = None
+                    if args.journal is not None:
+                        journal = stack.enter_context(Journal(args.journal))
+                    counts = apply_plan(plan, args.roms_dir, log_stderr if args.verbose else None, journal, quarantine_dir, args.jobs)
+            except (OSError, ValueError) as e:
+                print(f'Error: {e}', file=sys.stderr)
+                return 1
+            record['names_in'] = sum(counts.values())
+        if quarantine_dir is not None:
+            log_stderr(f'# Quarantined in {quarantine_dir}')
+            write_usage(usage, sys.stderr)
+        if args.verbose:
+            log_stderr(', '.join(f'{count} {key}' for (key, count) in counts.items()))
+    else:
+        with phase(stats, 'shell'):
+            write_shell(plan, sys.stdout)
+
+    return 0
@@ -0,0 +1,318 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+
+'''
+Usage: python3 -m organize_roms.dedupe [--apply] [--link auto|hard|reflink] [--jobs N] [--hash-cache FILE] DIR...
+
+Find identical files in the directories (and their buckets) and collapse each group into one.
+
+The files are compared in tiers, so only files that may be identical are read in full:
+1. the size (and the filesystem: links cannot cross filesystems)
+2. the CRC32 of the first and the last 64 KiB (skipped for files of at most 128 KiB, which it would read in full)
+3. the digests (SHA-1, MD5, CRC32) of the whole file
+
+Without --apply, print a shell script that replaces every copy but the first (by path) with a link to the first.
+With --link reflink, a copy shares the extents of the first (FICLONE; e.g. Btrfs, XFS),
+so each file can still be changed on its own. With --link hard, a copy becomes a hard link.
+With --link auto (the default), a reflink is tried first.
+Empty files and files that are already hard links of each other are left alone.
+A copy is only replaced if neither it nor the first file changed since they were hashed.
+
+Examples:
+python3 -m organize_roms.dedupe <base-path-to-roms>/'Nintendo - Game Boy' <base-path-to-roms>/'Nintendo - Game Boy Color' > dedupe.sh
+python3 -m organize_roms.dedupe --apply --link reflink --hash-cache ~/.cache/roms-hashes.sqlite <base-path-to-roms>
+'''
+
+import argparse
+import concurrent.futures
+import contextlib
+import fcntl
+import os
+from shlex import quote
+import shutil
+import sys
+import zlib
+
+from .digests import hash_file
+from .hashcache import HashCache, same_file
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+# bytes read from each end of a file for the second tier
+edge_size = 64 * 1024
+
+def find_files(paths) -> dict:
+    '''Get the paths of each inode (dev, ino) of the non-empty files in the paths and their subdirectories.
+
+    Hidden subdirectories (e.g. .quarantine) are skipped.
+    Return the inode to (stat, paths).
+    '''
+
+    inodes = {}
+
+    def visit(path):
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_file(follow_symlinks=False):
+                    st = entry.stat(follow_symlinks=False)
+                    if st.st_size == 0:
+                        continue
+                    inodes.setdefault((st.st_dev, st.st_ino), (st, []))[1].append(entry.path)
+                elif not entry.name.startswith('.') and entry.is_dir(follow_symlinks=False):
+                    visit(entry.path)
+
+    for path in paths:
+        visit(path)
+
+    for (_, inode_paths) in inodes.values():
+        inode_paths.sort()
+
+    return inodes
+
+def edge_crc(path) -> int:
+    '''Get the CRC32 of the first and the last edge_size bytes of the file.'''
+
+    with open(path, 'rb', buffering=0) as f:
+        crc = zlib.crc32(f.read(edge_size))
+        size = os.fstat(f.fileno()).st_size
+        if size > edge_size:
+            f.seek(max(edge_size, size - edge_size))
+            crc = zlib.crc32(f.read(edge_size), crc)
+
+    return crc
+
+def refine(groups, key_function, executor, keys = None) -> list:
+    '''Split each group of inodes by the key of its first path (computed in the executor). Drop the groups of one.
+
+    The key of each inode is also put into keys, if it is not None.
+    '''
+
+    futures = {}
+    for (i, group) in enumerate(groups):
+        for inode in group:
+            futures[executor.submit(key_function, inode)] = (i, inode)
+
+    keyed = {}
+    for future in concurrent.futures.as_completed(futures):
+        (i, inode) = futures[future]
+        key = future.result()
+        keyed.setdefault((i, key), []).append(inode)
+        if keys is not None:
+            keys[inode] = key
+
+    return [group for group in keyed.values() if len(group) > 1]
+
+def find_duplicates(paths, jobs = None, cache = None, log = None) -> list:
+    '''Get the groups of identical files. Each group is a sorted list of (stat, paths) of distinct inodes.'''
+
+    inodes = find_files(paths)
+
+    by_size = {}
+    for (inode, (st, _)) in inodes.items():
+        by_size.setdefault((st.st_dev, st.st_size), []).append(inode)
+    groups = [group for group in by_size.values() if len(group) > 1]
+
+    if log is not None:
+        log(f'# {len(inodes)} files; {sum(map(len, groups))} in {len(groups)} groups of the same size')
+
+    def first_path(inode):
+        return inodes[inode][1][0]
+
+    def full_hash(inode):
+        return hash_file(first_path(inode))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+
+        # The edges of a small file are the whole file, so it goes straight to the full hash.
+        small_groups = [group for group in groups if inodes[group[0]][0].st_size <= 2 * edge_size]
+        large_groups = [group for group in groups if inodes[group[0]][0].st_size > 2 * edge_size]
+        groups = small_groups + refine(large_groups, lambda inode: edge_crc(first_path(inode)), executor)
+
+        if log is not None:
+            log(f'# {sum(map(len, groups))} in {len(groups)} groups of the same head and tail (or small)')
+
+        if cache is None:
+            groups = refine(groups, full_hash, executor)
+        else:
+            # The cache is used from this thread only.
+            known = {}
+            for group in groups:
+                for inode in group:
+                    digests = cache.get(inodes[inode][0])
+                    if digests is not None:
+                        known[inode] = digests
+
+            def cached_hash(inode):
+                return known[inode] if inode in known else full_hash(inode)
+
+            keys = {}
+            new_groups = refine(groups, cached_hash, executor, keys)
+
+            for (inode, digests) in keys.items():
+                if inode not in known:
+                    st = inodes[inode][0]
+                    if same_file(st, os.stat(first_path(inode), follow_symlinks=False)):
+                        cache.put(st, digests)
+
+            groups = new_groups
+
+    if log is not None:
+        log(f'# {sum(map(len, groups))} in {len(groups)} groups of the same contents')
+
+    return sorted((sorted((inodes[inode] for inode in group), key=lambda item: item[1][0]) for group in groups),
+            key=lambda group: group[0][1][0])
+
+def reflink(src, dst) -> None:
+    '''Create dst sharing the extents of src (FICLONE), with the metadata of src.'''
+
+    with open(src, 'rb') as fsrc, open(dst, 'xb') as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+
+    shutil.copystat(src, dst)
+
+def collapse(src, dst, link: str) -> str:
+    '''Replace dst with a reflink or a hard link of src (atomically, through a temporary name).
+
+    Return the kind of link made.
+    '''
+
+    tmp = os.path.join(os.path.dirname(dst), f'.{os.path.basename(dst)}.dedupe')
+
+    try:
+        made = None
+        if link in ('auto', 'reflink'):
+            try:
+                reflink(src, tmp)
+                made = 'reflink'
+            except OSError:
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(tmp)
+                if link == 'reflink':
+                    raise
+        if made is None:
+            os.link(src, tmp)
+            made = 'hardlink'
+        os.replace(tmp, dst)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp)
+        raise
+
+    return made
+
+def shell_lines(groups, link: str):
+    '''Generate the lines of the shell script that collapses the groups.'''
+
+    yield '#!/usr/bin/sh'
+
+    for group in groups:
+        (_, (src, *_)) = group[0]
+        yield ''
+        yield f'# {group[0][0].st_size} bytes'
+        yield f'# keep {quote(src)}'
+        for (_, inode_paths) in group[1:]:
+            for dst in inode_paths:
+                tmp = quote(os.path.join(os.path.dirname(dst), f'.{os.path.basename(dst)}.dedupe'))
+                reflink_cmd = f'cp --reflink=always --preserve=all -- {quote(src)} {tmp}'
+                hardlink_cmd = f'ln -- {quote(src)} {tmp}'
+                if link == 'reflink':
+                    make = reflink_cmd
+                elif link == 'hard':
+                    make = hardlink_cmd
+                else:
+                    make = f'{{ {reflink_cmd} || {{ rm --force -- {tmp} && {hardlink_cmd} ; }} ; }}'
+                yield f'{make} && mv --force -- {tmp} {quote(dst)} || exit'
+
+def parse_args(argv):
+    '''Parse the command line arguments.'''
+
+    parser = argparse.ArgumentParser(
+            prog='organize_roms.dedupe',
+            description='Collapse identical files into links.')
+
+    parser.add_argument('dirs', nargs='+', metavar='DIR',
+            help='directory to look for identical files in')
+
+    parser.add_argument('--apply', action='store_true',
+            help='link the files instead of printing a shell script')
+
+    parser.add_argument('--link', choices=('auto', 'hard', 'reflink'), default='auto',
+            help='kind of link (default: %(default)s)')
+
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), metavar='N',
+            help='number of hashing threads (default: %(default)s)')
+
+    parser.add_argument('--hash-cache', metavar='FILE',
+            help='SQLite cache of the digests of unchanged files')
+
+    parser.add_argument('-v', '--verbose', action='store_true',
+            help='print each tier and each link to stderr')
+
+    return parser.parse_args(argv)
+
+def log_stderr(message: str) -> None:
+    '''Print the message to stderr.'''
+    print(message, file=sys.stderr)
+
+# pylint: disable=missing-function-docstring
+def main(argv = None):
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    args = parse_args(argv)
+
+    log = log_stderr if args.verbose else None
+
+    try:
+        with contextlib.ExitStack() as stack:
+            cache = None
+            if args.hash_cache is not None:
+                cache = stack.enter_context(HashCache(args.hash_cache))
+            groups = find_duplicates(args.dirs, args.jobs, cache, log)
+    except OSError as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+
+    copies = sum(len(inode_paths) for group in groups for (_, inode_paths) in group[1:])
+    reclaimable = sum(group[0][0].st_size * (len(group) - 1) for group in groups)
+
+    if not args.apply:
+        for line in shell_lines(groups, args.link):
+            print(line)
+        print(f'# {len(groups)} groups, {copies} copies, {reclaimable} bytes reclaimable', file=sys.stderr)
+        return 0
+
+    made = {'reflink': 0, 'hardlink': 0}
+
+    for group in groups:
+        (src_st, (src, *_)) = group[0]
+        for (st, inode_paths) in group[1:]:
+            for dst in inode_paths:
+                try:
+                    # Do not link a file that changed since it was hashed, nor replace one.
+                    if not same_file(src_st, os.stat(src, follow_symlinks=False)):
+                        print(f'# Warning: {quote(src)} changed; skipped {quote(dst)}', file=sys.stderr)
+                        continue
+                    if not same_file(st, os.stat(dst, follow_symlinks=False)):
+                        print(f'# Warning: {quote(dst)} changed; skipped', file=sys.stderr)
+                        continue
+                    kind = collapse(src, dst, args.link)
+                except OSError as e:
+                    print(f'Error: {e}', file=sys.stderr)
+                    return 1
+                made[kind] += 1
+                if log is not None:
+                    log(f'{kind} {quote(src)} -> {quote(dst)}')
+
+    print(f"# {len(groups)} groups, {made['reflink']} reflinks, {made['hardlink']} hard links, "
+            f'{reclaimable} bytes reclaimed', file=sys.stderr)
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,48 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+
+'''
+Digests of ROM files, as listed in No-Intro DATs.
+
+Each file is read once; its CRC32, MD5 and SHA-1 are computed in the same pass
+from one large buffer. hashlib and zlib release the GIL on large buffers, so files can be hashed in threads.
+'''
+
+from dataclasses import dataclass
+import hashlib
+import zlib
+
+@dataclass(frozen=True)
+class Digests:
+    '''The size and the digests (lower case hex) of a ROM.'''
+    size: int
+    crc: str
+    md5: str = None
+    sha1: str = None
+
+def hash_file(path, buffer_size: int = 1 << 20) -> Digests:
+    '''Compute the size, CRC32, MD5 and SHA-1 of the file in one pass.'''
+
+    crc = 0
+    md5 = hashlib.md5()
+    sha1 = hashlib.sha1()
+    size = 0
+
+    buf = bytearray(buffer_size)
+    view = memoryview(buf)
+
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            chunk = view[:n]
+            crc = zlib.crc32(chunk, crc)
+            md5.update(chunk)
+            sha1.update(chunk)
+            size += n
+
+    return Digests(size, f'{crc:08x}', md5.hexdigest(), sha1.hexdigest())
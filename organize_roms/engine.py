@@ -0,0 +1,349 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+
+'''
+The organizer pipeline.
+
+Phase 1 removes ROMs matching the glob patterns of development status.
+Phase 2 removes ROMs matching the glob patterns of territory.
+Phase 3 removes Europe, Japan ROMs with an equivalent USA version.
+Phase 4 removes Japan ROMs with an equivalent Europe version (if the profile wants it).
+
+BIOS files are kept after phase 1.
+
+Every name is parsed once (see names.py); the phases read the parsed fields.
+'''
+
+from dataclasses import dataclass, field
+import fnmatch
+import functools
+import os
+import re
+
+from .buckets import Buckets
+from .names import RomName, parse
+from .profiles import Profile, get_profile
+from .stats import phase
+
+@dataclass
+class Deletion:
+    '''ROMs removed by one phase.'''
+    comment: str
+    names: list
+
+@dataclass
+class Plan:
+    '''The result of running the pipeline over a set of file names.'''
+    profile: Profile
+    deletions: list = field(default_factory=list)
+    # names that survived every phase (BIOS files are not included)
+    kept: set = field(default_factory=set)
+    # (old name, new name) of the extension renames
+    renames: list = field(default_factory=list)
+    # directory name to the sorted names moved into it (every directory of the bucket table is present)
+    moves: dict = field(default_factory=dict)
+    # names left in the flat directory
+    unplaced: list = field(default_factory=list)
+
+def compile_globs(glob_patterns) -> tuple:
+    '''Compile the glob patterns to match functions.'''
+    return tuple(re.compile(fnmatch.translate(glob_pattern)).match for glob_pattern in glob_patterns)
+
+def compile_prefixes(prefixes):
+    '''Compile the prefixes to one match function, which matches the longest prefix that a string starts with.'''
+    if not prefixes: # empty
+        # never matches
+        return re.compile('(?!)').match
+    return re.compile('|'.join(map(re.escape, sorted(prefixes, key=len, reverse=True)))).match
+
+# glob patterns such as '*(Beta*' only look at the start of a (...) tag
+tag_glob_pattern = re.compile(r'\*\(([^*?[\]()]+)\*')
+
+class TagRule:
+    '''Match parsed names against glob patterns.
+
+    Glob patterns of the form '*(Prefix*' are compiled into one regex that is matched against each parsed tag,
+    so a name is scanned once however many patterns there are.
+    The alternatives are tried longest first, so a match is the longest prefix the tag starts with;
+    every glob pattern whose prefix starts that prefix (e.g. '*(Proto*' for 'Prototype') is hit too.
+    Any other glob pattern is matched against the whole name.
+    '''
+
+    __slots__ = ('glob_patterns', 'prefixes', 'match_tag', 'hits_of_prefix', 'match_other', 'matchers')
+
+    def __init__(self, glob_patterns):
+        self.glob_patterns = tuple(glob_patterns)
+        # prefix to the glob patterns of the prefix
+        glob_patterns_of_prefix = {}
+        other_glob_patterns = []
+        for glob_pattern in self.glob_patterns:
+            match = tag_glob_pattern.fullmatch(glob_pattern)
+            if match is None:
+                other_glob_patterns.append(glob_pattern)
+            else:
+                glob_patterns_of_prefix.setdefault(match.group(1), []).append(glob_pattern)
+        self.prefixes = tuple(glob_patterns_of_prefix)
+        self.match_tag = compile_prefixes(self.prefixes)
+        self.hits_of_prefix = {
+                prefix: tuple(glob_pattern
+                    for (other_prefix, other_glob_patterns_of_prefix) in glob_patterns_of_prefix.items()
+                    if prefix.startswith(other_prefix)
+                    for glob_pattern in other_glob_patterns_of_prefix)
+                for prefix in self.prefixes}
+        self.match_other = None
+        if other_glob_patterns: # not empty
+            self.match_other = re.compile('|'.join(map(fnmatch.translate, other_glob_patterns))).match
+        self.matchers = tuple(zip(other_glob_patterns, compile_globs(other_glob_patterns)))
+
+    def __call__(self, rom: RomName) -> bool:
+        return any(map(self.match_tag, rom.tags)) or (self.match_other is not None and self.match_other(rom.name) is not None)
+
+    def hits(self, rom: RomName) -> set:
+        '''Get the glob patterns that match the ROM.'''
+
+        hits = set()
+
+        for tag in rom.tags:
+            match = self.match_tag(tag)
+            if match is not None:
+                hits.update(self.hits_of_prefix[match.group()])
+
+        if self.match_other is not None and self.match_other(rom.name) is not None:
+            hits.update(glob_pattern for (glob_pattern, match) in self.matchers if match(rom.name))
+
+        return hits
+
+    def select(self, roms: dict, counts = None) -> set:
+        '''Get the names of the ROMs that match.
+
+        If counts is not None, count the ROMs that match each glob pattern in it, in the same scan
+        (a ROM may match more than one).
+        '''
+
+        if counts is None:
+            return {name for (name, rom) in roms.items() if self(rom)}
+
+        selected = set()
+
+        for (name, rom) in roms.items():
+            hits = self.hits(rom)
+            if hits: # not empty
+                selected.add(name)
+                for glob_pattern in hits:
+                    counts[glob_pattern] += 1
+
+        return selected
+
+class Rules:
+    '''The compiled rules of a profile.'''
+
+    def __init__(self, profile: Profile):
+        self.profile = profile
+        self.dev_status = TagRule(profile.glob_patterns_dev_status)
+        self.territory = TagRule(profile.glob_patterns_territory)
+        self.buckets = Buckets(profile)
+
+@functools.lru_cache(maxsize=None)
+def get_rules(profile_name: str) -> Rules:
+    '''Get the compiled rules of the named profile. Rules are compiled once per process.'''
+    return Rules(get_profile(profile_name))
+
+def rules_for(profile: Profile) -> Rules:
+    '''Get the compiled rules of the profile.
+
+    The rules of a registered profile are cached; a modified profile (e.g. with another bucket table) is compiled.
+    '''
+    if get_profile(profile.name) is profile:
+        return get_rules(profile.name)
+    return Rules(profile)
+
+def supersede(roms: dict, preferred_region: str, territories) -> set:
+    '''Get the ROMs of the territories that have an equivalent ROM of the preferred region.
+
+    A ROM is equivalent if it has the same title.
+    A ROM of the preferred region is never removed, e.g. (Japan, USA) is kept.
+    The ROMs are indexed once by title, so each ROM of the preferred region costs one dict lookup.
+    '''
+
+    index = {}
+    preferred_titles = set()
+
+    for rom in roms.values():
+        if preferred_region in rom.regions:
+            preferred_titles.add(rom.title)
+        elif rom.regions and rom.regions[0] in territories:
+            index.setdefault(rom.title, []).append(rom.name)
+
+    roms_to_delete = set()
+
+    for title in preferred_titles:
+        roms_to_delete.update(index.get(title, ()))
+
+    return roms_to_delete
+
+def organize(names, profile: Profile, classify = None, stats = None) -> Plan:
+    '''Run the removal phases over the file names.
+
+    classify maps a name to its bucket (default: the bucket table of the profile).
+    stats records each phase (see stats.py) unless it is None.
+    '''
+
+    rules = rules_for(profile)
+
+    with phase(stats, 'parse') as record:
+        roms = {name: parse(name) for name in names}
+        names = set(roms)
+        record['names_in'] = record['names_out'] = len(roms)
+
+    plan = Plan(profile)
+
+    # Remove ROMs (phase 1)
+
+    counts = None
+    if stats is not None:
+        counts = stats.rules['dev_status'] = dict.fromkeys(rules.dev_status.glob_patterns, 0)
+
+    with phase(stats, 'dev_status', len(roms)) as record:
+        roms_to_delete = rules.dev_status.select(roms, counts)
+        remove(roms, roms_to_delete)
+        if roms_to_delete: # not empty
+            plan.deletions.append(Deletion('# ROMs matching glob patterns of development status', sorted(roms_to_delete)))
+
+        # Keep all BIOS files after phase 1.
+        remove(roms, {name for (name, rom) in roms.items() if rom.bios})
+        record['names_out'] = len(roms)
+
+    # Remove ROMs (phase 2)
+
+    counts = None
+    if stats is not None:
+        counts = stats.rules['territory'] = dict.fromkeys(rules.territory.glob_patterns, 0)
+
+    with phase(stats, 'territory', len(roms)) as record:
+        roms_to_delete = rules.territory.select(roms, counts)
+        remove(roms, roms_to_delete)
+        if roms_to_delete: # not empty
+            plan.deletions.append(Deletion('# ROMs matching glob patterns of territory', sorted(roms_to_delete)))
+        record['names_out'] = len(roms)
+
+    # Remove ROMs (phase 3)
+
+    with phase(stats, 'supersede_usa', len(roms)) as record:
+        # Remove Europe, Japan ROMs when a USA version exists.
+        roms_to_delete = supersede(roms, 'USA', ('Europe', 'Japan'))
+        remove(roms, roms_to_delete)
+        if roms_to_delete: # not empty
+            plan.deletions.append(Deletion('# Europe, Japan ROMs with an equivalent USA version', sorted(roms_to_delete)))
+        record['names_out'] = len(roms)
+
+    # Remove ROMs (phase 4)
+
+    if profile.supersede_japan_with_europe:
+
+        with phase(stats, 'supersede_europe', len(roms)) as record:
+            # Do not consider USA ROMs
+            non_usa_roms = {name: rom for (name, rom) in roms.items() if 'USA' not in rom.regions}
+
+            # Remove Japan ROMs when a Europe version exists.
+            roms_to_delete = supersede(non_usa_roms, 'Europe', ('Japan',))
+            remove(roms, roms_to_delete)
+            if roms_to_delete: # not empty
+                plan.deletions.append(Deletion('# Japan ROMs with an equivalent Europe version', sorted(roms_to_delete)))
+            record['names_out'] = len(roms)
+
+    plan.kept = set(roms)
+
+    deleted = set()
+    for deletion in plan.deletions:
+        deleted.update(deletion.names)
+
+    names.difference_update(deleted)
+
+    with phase(stats, 'bucket', len(names)) as record:
+        place(plan, rules, names, classify)
+        record['names_out'] = sum(len(bucket_names) for bucket_names in plan.moves.values())
+
+    return plan
+
+def rename_ext(names: set, old_ext: str, new_ext: str) -> list:
+    '''Get the (old name, new name) pairs that change the extension. An existing file is not overwritten.'''
+
+    old_suffix = '.' + old_ext
+    new_suffix = '.' + new_ext
+    renames = []
+
+    for name in sorted(names):
+        if name.endswith(old_suffix) and not name.startswith('.'):
+            new_name = name[:-len(old_suffix)] + new_suffix
+            if new_name not in names:
+                renames.append((name, new_name))
+
+    return renames
+
+def place(plan: Plan, rules: Rules, names: set, classify = None) -> None:
+    '''Rename and classify the remaining files into the buckets of the profile.'''
+
+    profile = plan.profile
+
+    for ext_rename in profile.ext_renames:
+        renames = rename_ext(names, ext_rename.old_ext, ext_rename.new_ext)
+        for (old_name, new_name) in renames:
+            names.remove(old_name)
+            names.add(new_name)
+        plan.renames.extend(renames)
+
+    if not rules.buckets.dir_names: # empty
+        plan.unplaced = sorted(names)
+        return
+
+    (plan.moves, plan.unplaced) = classify_names(profile, rules, names, classify)
+
+def classify_names(profile: Profile, rules: Rules, names, classify = None) -> tuple:
+    '''Classify the names into the buckets of the profile.
+
+    Return the directory name to the sorted names of each bucket (every directory of the bucket table is present),
+    and the sorted names that match no bucket.
+    '''
+
+    if classify is None:
+        classify = rules.buckets.classify
+
+    moves = {dir_name: [] for dir_name in rules.buckets.dir_names}
+    unplaced = set()
+
+    for name in names:
+        dir_name = classify(name)
+        if dir_name is None:
+            unplaced.add(name)
+        else:
+            moves[dir_name].append(name)
+
+    for extra_move in profile.extra_moves:
+        if extra_move.name in unplaced:
+            unplaced.remove(extra_move.name)
+            moves.setdefault(extra_move.dir_name, []).append(extra_move.name)
+
+    for bucket_names in moves.values():
+        bucket_names.sort()
+
+    return (moves, sorted(unplaced))
+
+def remove(roms: dict, names) -> None:
+    '''Remove the names from the ROMs.'''
+    for name in names:
+        del roms[name]
+
+def scan(path = '.') -> set:
+    '''Get the names of the files in the path.'''
+
+    names = set()
+
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_file(follow_symlinks=False):
+                names.add(entry.name)
+
+    return names
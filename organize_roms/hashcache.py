@@ -0,0 +1,92 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+
+'''
+A persistent cache of the digests of files, so unchanged files are never read again.
+
+A file is identified by its device and inode, and its digests are valid while its size and mtime are unchanged.
+Renaming or moving a file into a bucket keeps its inode, so the cached digests follow it.
+A file replaced by another gets a new inode (or a new size or mtime) and is hashed again.
+'''
+
+import os
+import sqlite3
+import time
+
+from .catalog import racy_ns
+from .digests import Digests
+
+schema = '''
+CREATE TABLE IF NOT EXISTS hashes (
+    dev INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    crc TEXT NOT NULL,
+    md5 TEXT,
+    sha1 TEXT,
+    PRIMARY KEY (dev, inode)
+) WITHOUT ROWID;
+'''
+
+class HashCache:
+    '''The hash cache database. It is used from one thread.'''
+
+    def __init__(self, db_path, batch_size: int = 1000):
+        self.connection = sqlite3.connect(db_path)
+        self.connection.executescript(schema)
+        # New digests are committed in batches.
+        self.batch_size = batch_size
+        self.pending = 0
+        self.hits = 0
+        self.misses = 0
+
+    def close(self) -> None:
+        '''Commit and close the database.'''
+        self.connection.commit()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get(self, st: os.stat_result):
+        '''Get the cached digests of the file (None if they are not cached or no longer valid).'''
+
+        row = self.connection.execute(
+                'SELECT crc, md5, sha1 FROM hashes WHERE dev = ? AND inode = ? AND size = ? AND mtime_ns = ?',
+                (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)).fetchone()
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return Digests(st.st_size, *row)
+
+    def put(self, st: os.stat_result, digests: Digests) -> None:
+        '''Cache the digests of the file.
+
+        A file modified too recently is not cached: a later change within the same mtime tick would not be seen.
+        '''
+
+        if time.time_ns() - st.st_mtime_ns < racy_ns:
+            return
+
+        self.connection.execute(
+                'INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, digests.crc, digests.md5, digests.sha1))
+
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.connection.commit()
+            self.pending = 0
+
+def same_file(st1: os.stat_result, st2: os.stat_result) -> bool:
+    '''Check if the stats have the same identity, size and mtime (the file did not change in between).'''
+    return (st1.st_dev, st1.st_ino, st1.st_size, st1.st_mtime_ns) == (st2.st_dev, st2.st_ino, st2.st_size, st2.st_mtime_ns)
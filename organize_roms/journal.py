@@ -0,0 +1,318 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+
+'''
+Usage: python3 -m organize_roms.journal status|resume|undo [--verbose] [--jobs N] JOURNAL_FILE
+
+A journal of the operations of a run (see apply.py), to resume or undo it.
+
+The journal is a file of JSON lines:
+a header with the ROMs directory, every operation of the run, then a line for each committed batch of progress.
+All the operations are written and synced before the first one is carried out.
+The progress is committed in batches: the directories changed by the batch are synced, then the journal.
+After an interruption (a crash, a failed rename, a lost mount), resume skips the committed operations
+and checks each later one against the directory before carrying it out.
+
+Undo reverses the renames and moves of the run, newest first, removes the directories it created if they are empty,
+and creates again the directories it removed.
+A quarantine run left with only its manifest is removed too.
+Removed files cannot be restored, unless they were quarantined (see quarantine.py).
+
+Examples:
+python3 -m organize_roms --apply --journal nes.journal nes <base-path-to-roms>/'Nintendo - NES'
+python3 -m organize_roms.journal resume nes.journal
+python3 -m organize_roms.journal undo --verbose nes.journal
+'''
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from .apply import open_dir, run_operations, target
+from .quarantine import remove_empty_run
+
+class Journal:
+    '''The journal of one run.'''
+
+    def __init__(self, path, batch_size: int = 256, batch_seconds: float = 1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.batch_seconds = batch_seconds
+        self.file = None
+        # the ROMs directory
+        self.roms_dir = None
+        self.ops = []
+        # the number of operations carried out, and of those committed
+        self.done = 0
+        self.committed = 0
+        self.commit_time = 0.0
+        # buckets changed since the last commit
+        self.dirty_dirs = set()
+        # 'new', 'running', 'finished' or 'undone'
+        self.state = 'new'
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        '''Read the journal file.'''
+
+        journal = cls(path, **kwargs)
+
+        with open(path, encoding='utf-8') as f:
+            lines = f.read().split('\n')
+
+        for (i, line) in enumerate(lines):
+            if not line: # empty
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                if i >= len(lines) - 2:
+                    # The last line was cut short by a crash.
+                    break
+                raise ValueError(f'{path}: line {i + 1} is not valid JSON') from None
+            if isinstance(record, list):
+                journal.ops.append(tuple(record))
+            elif 'journal' in record:
+                journal.roms_dir = record['path']
+            elif 'begin' in record:
+                journal.state = 'running'
+            elif 'done' in record:
+                journal.done = journal.committed = record['done']
+            elif 'finished' in record:
+                journal.state = 'finished'
+            elif 'undone' in record:
+                journal.state = 'undone'
+
+        if journal.roms_dir is None:
+            raise ValueError(f'{path}: not a journal')
+
+        if journal.state == 'new':
+            # The operations were not all written, so none was carried out.
+            journal.ops = []
+
+        return journal
+
+    def write(self, record) -> None:
+        '''Append the record and sync the journal.'''
+        if self.file is None:
+            self.file = open(self.path, 'a', encoding='utf-8') # pylint: disable=consider-using-with
+        print(json.dumps(record, separators=(',', ':')), file=self.file)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self) -> None:
+        '''Close the journal file.'''
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def begin(self, roms_dir: str, ops: list) -> None:
+        '''Write the operations of a new run.'''
+
+        if self.state != 'new':
+            raise ValueError(f'{self.path}: the journal already has a run')
+
+        # Create the journal atomically, so no other run can use the same file.
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_CLOEXEC, 0o644)
+        self.file = os.fdopen(fd, 'w', encoding='utf-8')
+
+        self.roms_dir = roms_dir
+        self.ops = list(ops)
+
+        print(json.dumps({'journal': 1, 'path': roms_dir, 'time': time.strftime('%Y-%m-%dT%H:%M:%S%z')}), file=self.file)
+        for op in self.ops:
+            print(json.dumps(op, separators=(',', ':')), file=self.file)
+        self.write({'begin': len(self.ops)})
+
+        # Sync the directory of the journal too, so the journal itself survives a crash.
+        journal_dir_fd = open_dir(os.path.dirname(os.path.abspath(self.path)))
+        try:
+            os.fsync(journal_dir_fd)
+        finally:
+            os.close(journal_dir_fd)
+
+        self.state = 'running'
+        self.commit_time = time.monotonic()
+
+        if not self.ops: # empty
+            self.write({'finished': True})
+            self.state = 'finished'
+
+    def progress(self, done: int, dir_fd: int) -> None:
+        '''Record that the first done operations were carried out. Commit a full batch.'''
+
+        op = self.ops[done - 1]
+        if op[0] in ('move', 'quarantine'):
+            self.dirty_dirs.add(op[2])
+        elif op[0] == 'rename':
+            # the buckets of a re-bucketing rename (see rebucket.py)
+            self.dirty_dirs.update(filter(None, map(os.path.dirname, op[1:])))
+
+        self.done = done
+
+        if self.done - self.committed >= self.batch_size or time.monotonic() - self.commit_time >= self.batch_seconds:
+            self.commit(dir_fd)
+
+    def commit(self, dir_fd: int) -> None:
+        '''Sync the changed directories, then record the progress.'''
+
+        if self.done == self.committed:
+            return
+
+        os.fsync(dir_fd)
+        for dir_name in self.dirty_dirs:
+            try:
+                bucket_fd = open_dir(dir_name, dir_fd=dir_fd)
+            except FileNotFoundError:
+                # removed by the run
+                continue
+            try:
+                os.fsync(bucket_fd)
+            finally:
+                os.close(bucket_fd)
+        self.dirty_dirs.clear()
+
+        self.write({'done': self.done})
+        self.committed = self.done
+        self.commit_time = time.monotonic()
+
+        if self.done == len(self.ops):
+            self.write({'finished': True})
+            self.state = 'finished'
+
+def resume(journal: Journal, log = None, jobs: int = 1) -> dict:
+    '''Carry out the operations of the run that were not committed (in jobs threads, see run_operations).'''
+
+    if journal.state != 'running':
+        raise ValueError(f'{journal.path}: the run is {journal.state}')
+
+    return run_operations(journal.ops, journal.roms_dir, log, journal, journal.committed, resuming=True, jobs=jobs)
+
+def undo(journal: Journal, log = None) -> dict:
+    '''Reverse the operations of the run, newest first.
+
+    Every operation is checked against the directory, so undo can be run again after an interruption.
+    Return the number of files restored, of directories removed, and of removed files that cannot be restored.
+    '''
+
+    if journal.state not in ('running', 'finished'):
+        raise ValueError(f'{journal.path}: the run is {journal.state}')
+
+    counts = {'restored': 0, 'rmdir': 0, 'lost': 0}
+
+    dir_fd = open_dir(journal.roms_dir)
+
+    def exists(path):
+        try:
+            os.stat(path, dir_fd=dir_fd, follow_symlinks=False)
+            return True
+        except FileNotFoundError:
+            return False
+
+    # the quarantine directories of the run
+    run_dirs = set()
+
+    try:
+        for op in reversed(journal.ops):
+            kind = op[0]
+            if kind == 'quarantine':
+                run_dirs.add(op[2])
+            if kind == 'unlink':
+                if not exists(op[1]):
+                    counts['lost'] += 1
+            elif kind == 'rmdir':
+                if not exists(op[1]):
+                    os.mkdir(op[1], dir_fd=dir_fd)
+                    if log is not None:
+                        log(f'created directory {op[1]!r}')
+            elif kind == 'mkdir':
+                try:
+                    os.rmdir(op[1], dir_fd=dir_fd)
+                    counts['rmdir'] += 1
+                    if log is not None:
+                        log(f'removed directory {op[1]!r}')
+                except OSError:
+                    # not empty (or not created by the run)
+                    pass
+            elif exists(target(op)) and not exists(op[1]):
+                os.rename(target(op), op[1], src_dir_fd=dir_fd, dst_dir_fd=dir_fd)
+                counts['restored'] += 1
+                if log is not None:
+                    log(f'renamed {target(op)!r} -> {op[1]!r}')
+        for run_dir in sorted(run_dirs):
+            if exists(run_dir) and remove_empty_run(run_dir, dir_fd) and log is not None:
+                log(f'removed directory {run_dir!r}')
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+    journal.write({'undone': True})
+    journal.state = 'undone'
+
+    return counts
+
+def parse_args(argv):
+    '''Parse the command line arguments.'''
+
+    parser = argparse.ArgumentParser(
+            prog='organize_roms.journal',
+            description='Resume or undo a journaled run.')
+
+    parser.add_argument('command', choices=('status', 'resume', 'undo'),
+            help='what to do with the run')
+
+    parser.add_argument('journal_file',
+            help='journal of the run')
+
+    parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+            help='with resume, the number of threads that carry out the operations (default: %(default)s)')
+
+    parser.add_argument('-v', '--verbose', action='store_true',
+            help='print each operation to stderr')
+
+    return parser.parse_args(argv)
+
+def log_stderr(message: str) -> None:
+    '''Print the message to stderr.'''
+    print(message, file=sys.stderr)
+
+# pylint: disable=missing-function-docstring
+def main(argv = None):
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    args = parse_args(argv)
+
+    log = log_stderr if args.verbose else None
+
+    try:
+        with Journal.load(args.journal_file) as journal:
+            if args.command == 'status':
+                print(f'{journal.state}: {journal.committed} of {len(journal.ops)} operations in {journal.roms_dir}')
+                return 0
+            if args.command == 'resume':
+                counts = resume(journal, log, args.jobs)
+            else:
+                counts = undo(journal, log)
+    except (OSError, ValueError) as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+
+    print(', '.join(f'{count} {key}' for (key, count) in counts.items()), file=sys.stderr)
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,392 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+
+'''
+Usage: python3 -m organize_roms.layout [--max-entries N] [--max-depth D] [--json] [--names FILE [-0]] PLATFORM [ROMS_DIR]
+
+Compute a balanced bucket table for the ROMs that remain after the removal phases.
+
+The names are counted by their first alpha-numeric characters (ignoring other characters, as the bucket regexes do).
+A first character with more than N names is split by its second character, and so on up to D characters.
+The prefixes are then cut into contiguous buckets: as few as keep every bucket at most N names,
+balanced so that the largest bucket is as small as possible (linear partition).
+
+Print the bucket table to paste into profiles.py,
+or (with --json) a layout file for python3 -m organize_roms --layout FILE.
+
+Examples:
+python3 -m organize_roms.layout nes <base-path-to-roms>/'Nintendo - NES'
+python3 -m organize_roms.layout --max-entries 150 --json --names roms-list/Nintendo-Game-Boy gb > gb-layout.json
+'''
+
+import argparse
+import collections
+import dataclasses
+import json
+import os
+import re
+import sys
+
+from .buckets import Buckets
+from .engine import organize, scan
+from .listing import open_listing, read_names
+from .profiles import PROFILES, Profile, get_profile
+
+# the characters of a prefix, in the order of the buckets
+alphabet = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+letters = alphabet[10:]
+
+# matches the characters between the characters of a prefix
+skip = '[^[:alnum:]]*'
+
+bios_stem_pattern = re.compile(r'[\W_]*\[BIOS\]', re.IGNORECASE)
+
+def alnum_prefix(stem: str, depth: int) -> str:
+    '''Get the first depth alpha-numeric characters of the stem, folded to lower case (may be shorter).'''
+
+    prefix = []
+
+    for c in stem:
+        if c.isalnum():
+            prefix.append(c.casefold())
+            if len(prefix) == depth:
+                break
+
+    return ''.join(prefix)
+
+def prefix_counts(stems, depth: int) -> collections.Counter:
+    '''Count the stems by each of their prefixes of 1 to depth alpha-numeric characters.'''
+
+    counts = collections.Counter()
+
+    for stem in stems:
+        prefix = alnum_prefix(stem, depth)
+        for i in range(1, len(prefix) + 1):
+            counts[prefix[:i]] += 1
+
+    return counts
+
+def split_prefixes(counts, max_entries: int, max_depth: int) -> list:
+    '''Get the prefixes (in bucket order) of the letters, split by the next character where more than max_entries names share a prefix.'''
+
+    def split(prefix):
+        if counts[prefix] <= max_entries or len(prefix) == max_depth:
+            yield prefix
+            return
+        for c in alphabet:
+            yield from split(prefix + c)
+
+    return [prefix for letter in letters for prefix in split(letter)]
+
+def min_parts(weights, max_entries: int) -> int:
+    '''Get the least number of contiguous parts that keep every part at most max_entries (a heavier weight is a part by itself).'''
+
+    parts = 0
+    total = None
+
+    for weight in weights:
+        if total is None or total + weight > max_entries:
+            parts += 1
+            total = weight
+        else:
+            total += weight
+
+    return parts
+
+def linear_partition(weights, parts: int) -> list:
+    '''Cut the weights into contiguous parts so that the largest sum is as small as possible.
+
+    Return the start index of each part.
+    With the prefix sums, the best cut for i weights in j parts is where the largest sum of j - 1 parts
+    (nondecreasing in the cut) meets the sum of the last part (nonincreasing in the cut), found by bisection.
+    '''
+
+    n = len(weights)
+    parts = min(parts, n)
+
+    sums = [0]
+    for weight in weights:
+        sums.append(sums[-1] + weight)
+
+    # cost[i]: the largest sum of the best cut of the first i weights into j parts
+    cost = sums[:]
+    cuts = [[0] * (n + 1)]
+
+    for _ in range(1, parts):
+
+        new_cost = [0] * (n + 1)
+        new_cut = [0] * (n + 1)
+
+        for i in range(1, n + 1):
+            # the first cut s in [1, i) where cost[s] >= sums[i] - sums[s]
+            (lo, hi) = (1, i)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if cost[mid] >= sums[i] - sums[mid]:
+                    hi = mid
+                else:
+                    lo = mid + 1
+            best = None
+            for s in (lo - 1, lo):
+                if 1 <= s < i:
+                    c = max(cost[s], sums[i] - sums[s])
+                    if best is None or c < best:
+                        (best, new_cut[i]) = (c, s)
+            new_cost[i] = cost[i] if best is None else best
+
+        cost = new_cost
+        cuts.append(new_cut)
+
+    starts = []
+    i = n
+    for j in range(parts - 1, 0, -1):
+        i = cuts[j][i]
+        starts.append(i)
+    starts.append(0)
+
+    return sorted(set(starts))
+
+def char_class(chars: str, upper: bool) -> str:
+    '''Get the regex of a contiguous run of the alphabet.'''
+
+    if upper:
+        chars = chars.upper()
+
+    if len(chars) == 1:
+        return chars
+
+    ranges = []
+    for run in (''.join(c for c in chars if c.isdigit()), ''.join(c for c in chars if not c.isdigit())):
+        if len(run) == 1:
+            ranges.append(run)
+        elif run: # not empty
+            ranges.append(f'{run[0]}-{run[-1]}')
+
+    return '[' + ''.join(ranges) + ']'
+
+def prefixes_regex(prefixes) -> str:
+    '''Get the regex (without the surrounding parts) of a contiguous range of prefixes.'''
+
+    groups = []
+
+    for prefix in prefixes:
+        parent = prefix[:-1]
+        if groups and groups[-1][0] == parent:
+            groups[-1][1].append(prefix[-1])
+        else:
+            groups.append((parent, [prefix[-1]]))
+
+    alternatives = []
+
+    for (parent, chars) in groups:
+        head = ''.join(c.upper() if i == 0 else c for (i, c) in enumerate(parent))
+        alternatives.append(''.join(c + skip for c in head) + char_class(''.join(chars), not parent))
+
+    if len(alternatives) == 1:
+        return alternatives[0]
+
+    return '(' + '|'.join(alternatives) + ')'
+
+def prefix_label(prefix: str) -> str:
+    '''Get the directory name of a prefix, e.g. Ma.'''
+    return prefix[0].upper() + prefix[1:]
+
+def compute_layout(stems, profile: Profile, max_entries: int, max_depth: int = 3) -> tuple:
+    '''Compute the bucket table for the stems of the ROMs.
+
+    Return the table (directory name to -iregex pattern) and the number of names in each bucket.
+    The prefixes without names are added to a neighbouring bucket, so every name of a later DAT is placed.
+    '''
+
+    stems = list(stems)
+    bios = sum(1 for stem in stems if bios_stem_pattern.match(stem))
+    counts = prefix_counts((stem for stem in stems if not bios_stem_pattern.match(stem)), max_depth)
+
+    ext = profile.rom_ext
+    table = {}
+    sizes = {}
+
+    # The buckets of the profile for other files (e.g. SNES _Enhancement_Chip) are kept.
+    if profile.bucket_match == 'iregex':
+        for (dir_name, pattern) in profile.dir_name_to_pattern.items():
+            if dir_name.startswith('_') and dir_name != '_BIOS':
+                table[dir_name] = pattern
+
+    table['_BIOS'] = rf'\./{skip}\[BIOS\].*\.{ext}'
+    sizes['_BIOS'] = bios
+
+    table['0-9'] = rf'\./{skip}[0-9].*\.{ext}'
+    sizes['0-9'] = sum(counts[c] for c in alphabet[:10])
+
+    prefixes = split_prefixes(counts, max_entries, max_depth)
+    weights = [counts[prefix] for prefix in prefixes]
+
+    # Only the prefixes with names are partitioned.
+    nonempty = [i for (i, weight) in enumerate(weights) if weight]
+
+    if nonempty: # not empty
+        starts = linear_partition([weights[i] for i in nonempty], min_parts((weights[i] for i in nonempty), max_entries))
+        for (k, start) in enumerate(starts):
+            first = nonempty[start]
+            last = nonempty[starts[k + 1] - 1] if k + 1 < len(starts) else nonempty[-1]
+            # from the first prefix (0 for the first bucket) to the one before the next bucket
+            lo = 0 if k == 0 else first
+            hi = nonempty[starts[k + 1]] if k + 1 < len(starts) else len(prefixes)
+            dir_name = prefix_label(prefixes[first])
+            if last != first:
+                dir_name += '-' + prefix_label(prefixes[last])
+            table[dir_name] = rf'\./{skip}{prefixes_regex(prefixes[lo:hi])}.*\.{ext}'
+            sizes[dir_name] = sum(weights[lo:hi])
+
+    return (table, sizes)
+
+def unplaced_stems(stems, profile: Profile, table: dict) -> list:
+    '''Get the stems whose ROM name matches no bucket of the table (classified like the organizer does).'''
+
+    buckets = Buckets(dataclasses.replace(profile, dir_name_to_pattern=table, bucket_match='iregex'))
+
+    return [stem for stem in stems if buckets.classify(stem + '.' + profile.rom_ext) is None]
+
+def layout_stems(names, profile: Profile) -> list:
+    '''Get the stems of the ROMs that the letter buckets would hold after the removal phases.'''
+
+    plan = organize(names, profile)
+    # The bucket regexes ignore case, e.g. .GB
+    suffix = '.' + profile.rom_ext.casefold()
+
+    stems = []
+
+    for (dir_name, bucket_names) in plan.moves.items():
+        if dir_name.startswith('_') and dir_name != '_BIOS':
+            continue
+        stems.extend(name[:-len(suffix)] for name in bucket_names if name[-len(suffix):].casefold() == suffix)
+
+    stems.extend(name[:-len(suffix)] for name in plan.unplaced if name[-len(suffix):].casefold() == suffix)
+
+    return stems
+
+def apply_layout(profile: Profile, layout: dict) -> Profile:
+    '''Get the profile with the bucket table of the layout.
+
+    The extra moves go into the bucket that would hold the name with the ROM extension.
+    '''
+
+    profile = dataclasses.replace(profile,
+            dir_name_to_pattern=dict(layout['dir_name_to_pattern']),
+            bucket_match=layout.get('bucket_match', 'iregex'))
+
+    buckets = Buckets(profile)
+
+    extra_moves = []
+    for extra_move in profile.extra_moves:
+        dir_name = buckets.classify(os.path.splitext(extra_move.name)[0] + '.' + profile.rom_ext)
+        if dir_name is not None:
+            extra_move = dataclasses.replace(extra_move, dir_name=dir_name)
+        extra_moves.append(extra_move)
+
+    return dataclasses.replace(profile, extra_moves=tuple(extra_moves))
+
+def load_layout(profile: Profile, path) -> Profile:
+    '''Get the profile with the bucket table of the layout file.'''
+
+    with open(path, encoding='utf-8') as f:
+        layout = json.load(f)
+
+    if layout.get('platform', profile.name) != profile.name:
+        raise ValueError(f"The layout is for {layout['platform']!r}, not {profile.name!r}")
+
+    return apply_layout(profile, layout)
+
+def parse_args(argv):
+    '''Parse the command line arguments.'''
+
+    parser = argparse.ArgumentParser(
+            prog='organize_roms.layout',
+            description='Compute a balanced bucket table.')
+
+    parser.add_argument('platform', choices=PROFILES.keys(),
+            help='platform of the ROMs')
+
+    parser.add_argument('roms_dir', nargs='?', default='.',
+            help='directory that contains the ROMs (default: the current directory)')
+
+    parser.add_argument('-n', '--max-entries', type=int, default=256, metavar='N',
+            help='the most names in a bucket (default: %(default)s)')
+
+    parser.add_argument('-d', '--max-depth', type=int, default=3, metavar='D',
+            help='the longest prefix of a bucket (default: %(default)s)')
+
+    parser.add_argument('--json', action='store_true',
+            help='print a layout file instead of a table for profiles.py')
+
+    parser.add_argument('--names', metavar='FILE',
+            help='read the file names from a listing (- for stdin) instead of ROMS_DIR')
+
+    parser.add_argument('-0', '--null', action='store_true',
+            help='with --names, the names are NUL-delimited instead of newline-delimited')
+
+    args = parser.parse_args(argv)
+
+    if args.max_entries < 1 or args.max_depth < 1:
+        parser.error('--max-entries and --max-depth must be positive')
+
+    return args
+
+# pylint: disable=missing-function-docstring
+def main(argv = None):
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    args = parse_args(argv)
+
+    profile = get_profile(args.platform)
+
+    try:
+        if args.names is not None:
+            with open_listing(args.names) as f:
+                stems = layout_stems(read_names(f, args.null), profile)
+        else:
+            stems = layout_stems(scan(args.roms_dir), profile)
+    except OSError as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+
+    (table, sizes) = compute_layout(stems, profile, args.max_entries, args.max_depth)
+
+    unplaced = unplaced_stems(stems, profile, table)
+    if unplaced: # not empty
+        print(f'# Warning: {len(unplaced)} names have no bucket (no alpha-numeric character, or too short a prefix)', file=sys.stderr)
+
+    for (dir_name, size) in sizes.items():
+        if size > args.max_entries:
+            print(f'# Warning: {dir_name} has {size} names (more than {args.max_entries})', file=sys.stderr)
+
+    if args.json:
+        json.dump({
+                'platform': profile.name,
+                'max_entries': args.max_entries,
+                'bucket_match': 'iregex',
+                'dir_name_to_pattern': table,
+                'sizes': sizes,
+                }, sys.stdout, indent=1)
+        print()
+        return 0
+
+    print(f'# {profile.name}: {len(stems)} names in {len(sizes)} buckets of at most {max(sizes.values())} names')
+    print("        bucket_match='iregex',")
+    print('        dir_name_to_pattern={')
+    dir_name_max_len = max(len(repr(dir_name)) for dir_name in table)
+    for (dir_name, pattern) in table.items():
+        comment = f' # {sizes[dir_name]}' if dir_name in sizes else ''
+        print(f"                {repr(dir_name):<{dir_name_max_len}} : r'{pattern}',{comment}")
+    print('                },')
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
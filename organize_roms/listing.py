@@ -0,0 +1,129 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+
+'''
+Read file names from a listing instead of a directory.
+
+A listing is newline-delimited (e.g. roms-list/Nintendo-Game-Boy)
+or NUL-delimited (e.g. the output of find . -maxdepth 1 -type f -print0).
+Only the base name of each entry is kept, so find output with paths works too.
+
+The names are generated while the listing is read, so a plan can be made
+for remote or offline storage without mounting it or creating placeholder files.
+
+A listing in a regular file is memory-mapped and decoded a window at a time straight from the map,
+so the file is never copied into bytes and the memory stays flat however long the listing is.
+Stdin (a pipe) is read in chunks.
+'''
+
+import contextlib
+import io
+import mmap
+import os
+import stat
+import sys
+
+def decode(block) -> str:
+    '''Decode a block of the listing (bytes or a memoryview), like os.fsdecode.'''
+    return str(block, sys.getfilesystemencoding(), sys.getfilesystemencodeerrors())
+
+def text_names(text: str, null: bool = False):
+    '''Generate the base names of the entries of a decoded block of the listing.
+
+    The delimiters are ASCII, so decoding a whole block at once gives the same names as decoding each entry
+    (and is much faster).
+    '''
+
+    for line in text.split('\0' if null else '\n'):
+        if not null:
+            line = line.rstrip('\r')
+        name = line.rpartition('/')[2]
+        if name:
+            yield name
+
+def split_names(chunks, null: bool = False):
+    '''Generate the names of the listing read in chunks of bytes.'''
+
+    delimiter = b'\0' if null else b'\n'
+    rest = b''
+
+    for chunk in chunks:
+        data = rest + chunk
+        # the end of the last complete entry
+        cut = data.rfind(delimiter) + 1
+        rest = data[cut:]
+        if cut:
+            yield from text_names(decode(memoryview(data)[:cut]), null)
+
+    yield from text_names(decode(rest), null)
+
+def map_names(mm: mmap.mmap, null: bool = False, window: int = 1 << 16):
+    '''Generate the names of the listing in the memory map, like split_names. The map is closed at the end.
+
+    The map is decoded a window at a time straight from its pages, without copying it to bytes first.
+    '''
+
+    delimiter = b'\0' if null else b'\n'
+    size = len(mm)
+    view = memoryview(mm)
+    start = 0
+
+    try:
+        while start < size:
+            end = min(start + window, size)
+            if end < size:
+                # End the window after its last complete entry (or after an entry longer than the window).
+                cut = mm.rfind(delimiter, start, end)
+                if cut == -1:
+                    cut = mm.find(delimiter, end)
+                end = size if cut == -1 else cut + 1
+            text = decode(view[start:end])
+            start = end
+            yield from text_names(text, null)
+    finally:
+        view.release()
+        mm.close()
+
+def map_file(file):
+    '''Memory-map the binary file for reading. Return None if it cannot be mapped (e.g. a pipe or an empty file).'''
+
+    try:
+        fileno = file.fileno()
+        st = os.fstat(fileno)
+        if not stat.S_ISREG(st.st_mode) or st.st_size == 0:
+            return None
+        mm = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError, io.UnsupportedOperation):
+        return None
+
+    if hasattr(mmap, 'MADV_SEQUENTIAL'):
+        mm.madvise(mmap.MADV_SEQUENTIAL)
+
+    return mm
+
+def read_chunks(file, chunk_size: int = 1 << 16):
+    '''Generate the chunks of the binary file.'''
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk: # empty
+            return
+        yield chunk
+
+@contextlib.contextmanager
+def open_listing(path):
+    '''Open the listing for reading bytes ('-' is stdin).'''
+    if path == '-':
+        yield sys.stdin.buffer
+    else:
+        with open(path, 'rb') as f:
+            yield f
+
+def read_names(file, null: bool = False):
+    '''Generate the names of the listing in the binary file (memory-mapped if it is a regular file).'''
+    mm = map_file(file)
+    if mm is None:
+        return split_names(read_chunks(file), null)
+    return map_names(mm, null)
@@ -0,0 +1,149 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+
+'''
+Parsed No-Intro file names.
+
+https://wiki.no-intro.org/index.php?title=Naming_Convention
+
+Examples:
+Super Mario Bros. (World).nes
+Legend of Zelda, The (USA) (Rev 1).nes
+Kirby's Adventure (Europe) (En,Fr,De).nes
+[BIOS] Nintendo Famicom Disk System (Japan).nes
+Disk Writer EEPROM Pak (Japan) (En) (Program) [b].bin
+
+Each name is parsed once (the parser is memoized) and the tag strings are interned,
+so the many copies of "(USA)" or "(Rev 1)" share one string.
+'''
+
+import functools
+import re
+import sys
+
+REGIONS = frozenset((
+        'Argentina',
+        'Asia',
+        'Australia',
+        'Austria',
+        'Belgium',
+        'Brazil',
+        'Canada',
+        'China',
+        'Croatia',
+        'Denmark',
+        'Europe',
+        'Finland',
+        'France',
+        'Germany',
+        'Greece',
+        'Hong Kong',
+        'India',
+        'Ireland',
+        'Israel',
+        'Italy',
+        'Japan',
+        'Korea',
+        'Latin America',
+        'Mexico',
+        'Netherlands',
+        'New Zealand',
+        'Norway',
+        'Poland',
+        'Portugal',
+        'Russia',
+        'Scandinavia',
+        'South Africa',
+        'Spain',
+        'Sweden',
+        'Switzerland',
+        'Taiwan',
+        'UAE',
+        'United Kingdom',
+        'Unknown',
+        'USA',
+        'World',
+        ))
+
+DEV_STATUSES = (
+        'Auto Demo',
+        'Beta',
+        'Demo',
+        'Pirate',
+        'Prerelease',
+        'Preview',
+        'Proto',
+        'Putative Beta',
+        'Sample',
+        'Sega Channel',
+        'Tech Demo',
+        'Test Program',
+        )
+
+tag_pattern = re.compile(r'\(([^()]*)\)')
+flag_pattern = re.compile(r'\[([^][]*)\]')
+languages_pattern = re.compile(r'[A-Z][a-z](?:-[A-Z][a-z]+)?(?:[,+][A-Z][a-z](?:-[A-Z][a-z]+)?)*')
+
+class RomName:
+    '''A file name split into the fields of the No-Intro naming convention.'''
+
+    __slots__ = (
+            'name',       # the whole file name
+            'ext',        # extension without the dot ('' if none)
+            'title',      # text before the region tag (or before the first tag)
+            'regions',    # tuple of regions of the region tag
+            'languages',  # tuple of languages of the languages tag
+            'revision',   # text after "Rev " (None if none)
+            'dev_status', # the development status tag (None if none)
+            'tags',       # tuple of every (...) tag
+            'flags',      # tuple of every [...] flag
+            'bios',       # the name has the BIOS marker
+            )
+
+    def __init__(self, name: str):
+
+        self.name = name
+
+        (stem, dot, ext) = name.rpartition('.')
+        if not dot or '(' in ext or ')' in ext:
+            (stem, ext) = (name, '')
+        self.ext = ext
+
+        tags = tuple(sys.intern(tag) for tag in tag_pattern.findall(stem))
+        self.tags = tags
+        self.flags = tuple(sys.intern(flag) for flag in flag_pattern.findall(stem))
+        self.bios = 'BIOS' in name
+
+        self.regions = ()
+        self.languages = ()
+        self.revision = None
+        self.dev_status = None
+
+        title_end = stem.find(' (')
+
+        for tag in tags:
+            if not self.regions:
+                regions = tag.split(', ')
+                if all(region in REGIONS for region in regions):
+                    self.regions = tuple(sys.intern(region) for region in regions)
+                    title_end = stem.find(' (' + tag + ')')
+                    continue
+            if not self.languages and languages_pattern.fullmatch(tag):
+                self.languages = tuple(sys.intern(language) for language in re.split('[,+]', tag))
+            elif self.revision is None and tag.startswith('Rev '):
+                self.revision = sys.intern(tag[4:])
+            elif self.dev_status is None and tag.startswith(DEV_STATUSES):
+                self.dev_status = tag
+
+        self.title = stem if title_end == -1 else stem[:title_end]
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.name!r})'
+
+@functools.lru_cache(maxsize=1 << 18)
+def parse(name: str) -> RomName:
+    '''Parse the file name. The result is memoized; do not modify it.'''
+    return RomName(name)
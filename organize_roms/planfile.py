@@ -0,0 +1,221 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+
+'''
+Usage: python3 -m organize_roms.planfile show|diff|apply ...
+
+Save a plan to a file, to review, compare or apply it later (e.g. on the storage host).
+
+python3 -m organize_roms.planfile show PLAN_FILE
+    Print the shell script of the plan.
+python3 -m organize_roms.planfile diff OLD_PLAN_FILE NEW_PLAN_FILE
+    Print the files whose fate differs between the plans (e.g. before and after a DAT refresh or a rule change).
+python3 -m organize_roms.planfile apply [--verbose] [--journal FILE] [--quarantine] [--jobs N] PLAN_FILE [ROMS_DIR]
+    Carry out the plan. Nothing is done unless every file of the plan is in ROMS_DIR.
+    With --quarantine, the removed files are moved into a quarantine directory (see python3 -m organize_roms.quarantine).
+
+A plan file is JSON (compressed with gzip if its name ends with .gz):
+the platform, the deletions of each phase, the renames, the moves into each bucket, and the files left in place.
+
+Examples:
+python3 -m organize_roms --names roms-list/Nintendo-Game-Boy --save-plan gb.plan.json.gz gb
+python3 -m organize_roms.planfile diff gb-20230318.plan.json.gz gb.plan.json.gz
+ssh nas python3 -m organize_roms.planfile apply --journal gb.journal gb.plan.json.gz /roms/gb
+'''
+
+import argparse
+import contextlib
+import gzip
+import json
+from shlex import quote
+import sys
+import time
+
+from . import __version__
+from .apply import apply_plan
+from .engine import Deletion, Plan, scan
+from .journal import Journal
+from .names import parse
+from .profiles import get_profile
+from .quarantine import prepare, write_usage
+from .shell import write_shell
+
+def open_plan_file(path, mode: str):
+    '''Open the plan file as text (through gzip if its name ends with .gz).'''
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+def save_plan(plan: Plan, path) -> None:
+    '''Save the plan to the file.'''
+
+    with open_plan_file(path, 'w') as f:
+        json.dump({
+                'planfile': 1,
+                'platform': plan.profile.name,
+                'version': __version__,
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'deletions': [{'comment': deletion.comment, 'names': deletion.names} for deletion in plan.deletions],
+                'renames': plan.renames,
+                'moves': plan.moves,
+                'unplaced': plan.unplaced,
+                }, f, separators=(',', ':'))
+        print(file=f)
+
+def load_plan(path) -> Plan:
+    '''Load the plan from the file.'''
+
+    with open_plan_file(path, 'r') as f:
+        data = json.load(f)
+
+    if data.get('planfile') != 1:
+        raise ValueError(f'{path}: not a plan file')
+
+    plan = Plan(get_profile(data['platform']))
+    plan.deletions = [Deletion(deletion['comment'], deletion['names']) for deletion in data['deletions']]
+    plan.renames = [tuple(rename) for rename in data['renames']]
+    plan.moves = data['moves']
+    plan.unplaced = data['unplaced']
+
+    # The names that survived every phase, by their names before the renames
+    old_names = {new_name: old_name for (old_name, new_name) in plan.renames}
+    for names in list(plan.moves.values()) + [plan.unplaced]:
+        plan.kept.update(old_names.get(name, name) for name in names)
+    plan.kept = {name for name in plan.kept if not parse(name).bios}
+
+    return plan
+
+def plan_names(plan: Plan) -> set:
+    '''Get the names of the files the plan expects in the ROMs directory.'''
+
+    names = set()
+
+    for deletion in plan.deletions:
+        names.update(deletion.names)
+
+    old_names = {new_name: old_name for (old_name, new_name) in plan.renames}
+    for names_of_dir in list(plan.moves.values()) + [plan.unplaced]:
+        names.update(old_names.get(name, name) for name in names_of_dir)
+
+    return names
+
+def fates(plan: Plan) -> dict:
+    '''Get what the plan does with each file: the comment of its deletion, or its path after the plan.'''
+
+    result = {}
+
+    for deletion in plan.deletions:
+        for name in deletion.names:
+            result[name] = deletion.comment.lstrip('# ')
+
+    old_names = {new_name: old_name for (old_name, new_name) in plan.renames}
+
+    for (dir_name, names) in plan.moves.items():
+        for name in names:
+            result[old_names.get(name, name)] = f'{dir_name}/{name}'
+
+    for name in plan.unplaced:
+        result[old_names.get(name, name)] = name
+
+    return result
+
+def diff_plans(old_plan: Plan, new_plan: Plan):
+    '''Generate the (name, old fate, new fate) of the files whose fate differs, sorted by name (a fate is None if the plan does not have the file).'''
+
+    old_fates = fates(old_plan)
+    new_fates = fates(new_plan)
+
+    for name in sorted(old_fates.keys() | new_fates.keys()):
+        old_fate = old_fates.get(name)
+        new_fate = new_fates.get(name)
+        if old_fate != new_fate:
+            yield (name, old_fate, new_fate)
+
+def parse_args(argv):
+    '''Parse the command line arguments.'''
+
+    parser = argparse.ArgumentParser(
+            prog='organize_roms.planfile',
+            description='Show, compare or apply plan files.')
+
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    show_parser = subparsers.add_parser('show', help='print the shell script of the plan')
+    show_parser.add_argument('plan_file')
+
+    diff_parser = subparsers.add_parser('diff', help='print the files whose fate differs between the plans')
+    diff_parser.add_argument('old_plan_file')
+    diff_parser.add_argument('new_plan_file')
+
+    apply_parser = subparsers.add_parser('apply', help='carry out the plan')
+    apply_parser.add_argument('plan_file')
+    apply_parser.add_argument('roms_dir', nargs='?', default='.',
+            help='directory that contains the ROMs (default: the current directory)')
+    apply_parser.add_argument('--journal', metavar='FILE',
+            help='journal the operations in FILE (see python3 -m organize_roms.journal)')
+    apply_parser.add_argument('--quarantine', action='store_true',
+            help='move the removed files into a quarantine directory instead of deleting them')
+    apply_parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+            help='number of threads that carry out the operations (default: %(default)s)')
+    apply_parser.add_argument('-v', '--verbose', action='store_true',
+            help='print each operation to stderr')
+
+    return parser.parse_args(argv)
+
+def log_stderr(message: str) -> None:
+    '''Print the message to stderr.'''
+    print(message, file=sys.stderr)
+
+# pylint: disable=missing-function-docstring
+def main(argv = None):
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    args = parse_args(argv)
+
+    try:
+
+        if args.command == 'show':
+            write_shell(load_plan(args.plan_file), sys.stdout)
+
+        elif args.command == 'diff':
+            count = 0
+            for (name, old_fate, new_fate) in diff_plans(load_plan(args.old_plan_file), load_plan(args.new_plan_file)):
+                print(f'{quote(name)}: {old_fate or "(absent)"} -> {new_fate or "(absent)"}')
+                count += 1
+            print(f'# {count} files differ', file=sys.stderr)
+
+        else:
+            plan = load_plan(args.plan_file)
+            missing = plan_names(plan) - scan(args.roms_dir)
+            if missing: # not empty
+                print(f'Error: {len(missing)} files of the plan are not in {quote(args.roms_dir)}, e.g. {quote(min(missing))}',
+                        file=sys.stderr)
+                return 1
+            log = log_stderr if args.verbose else None
+            quarantine_dir = None
+            if args.quarantine and plan.deletions: # not empty
+                (quarantine_dir, usage) = prepare(plan, args.roms_dir)
+            with contextlib.ExitStack() as stack:
+                journal = None
+                if args.journal is not None:
+                    journal = stack.enter_context(Journal(args.journal))
+                counts = apply_plan(plan, args.roms_dir, log, journal, quarantine_dir, args.jobs)
+            if quarantine_dir is not None:
+                log_stderr(f'# Quarantined in {quarantine_dir}')
+                write_usage(usage, sys.stderr)
+            if args.verbose:
+                log_stderr(', '.join(f'{count} {key}' for (key, count) in counts.items()))
+
+    except (OSError, ValueError, KeyError) as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,371 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+# pylint: disable=pointless-string-statement
+
+'''
+Platform profiles.
+
+A profile holds everything that used to differ between the organize-roms-*.py scripts:
+the ROM extension, the glob patterns of the removal phases, the bucket table, and special cases.
+'''
+
+from dataclasses import dataclass
+
+@dataclass(frozen=True)
+class ExtRename:
+    '''Rename every file with extension old_ext to new_ext before bucketing.'''
+    old_ext: str
+    new_ext: str
+    comments: tuple = ()
+
+@dataclass(frozen=True)
+class ExtraMove:
+    '''Move a file that the bucket table does not catch, if it exists.'''
+    name: str
+    dir_name: str
+    comment: str = ''
+
+@dataclass(frozen=True)
+class Profile:
+    '''Everything the engine needs to organize the ROMs of one platform.'''
+
+    # short name used on the command line
+    name: str
+
+    # directory name of the No-Intro set, without the DAT date
+    set_name: str
+
+    rom_ext: str
+
+    glob_patterns_dev_status: tuple
+
+    glob_patterns_territory: tuple
+
+    # Map of directory name to pattern.
+    # The first pattern that matches a file moves it into that directory.
+    dir_name_to_pattern: dict
+
+    # 'iregex' (find -regextype posix-extended -iregex) or 'iname' (find -iname)
+    bucket_match: str = 'iregex'
+
+    ext_renames: tuple = ()
+
+    extra_moves: tuple = ()
+
+    # We may want to keep the Japan ROMs because they're NTSC rather than PAL.
+    supersede_japan_with_europe: bool = False
+
+glob_patterns_dev_status = (
+        # keep
+        #'*(Aftermarket*',
+        #'*(Alt*',
+        #'*(Unl*',
+        '*(Beta*',
+        '*(Demo*',
+        '*(Pirate*',
+        '*(Prerelease*',
+        '*(Preview*',
+        '*(Proto*',
+        '*(Putative Beta*',
+        '*(Sample*',
+        '*(Tech Demo*',
+        '*(Test Program*',
+        )
+
+glob_patterns_dev_status_sega = tuple(sorted(glob_patterns_dev_status + (
+        '*(Sega Channel*',
+        )))
+
+glob_patterns_dev_status_gg = tuple(sorted(glob_patterns_dev_status + (
+        '*(Auto Demo*',
+        )))
+
+glob_patterns_territory = (
+        # keep
+        #'*(Europe*',
+        #'*(Japan*',
+        #'*(USA*',
+        '*(Argentina*',
+        '*(Asia*',
+        '*(Australia*',
+        '*(Brazil*',
+        '*(Canada*',
+        '*(China*',
+        '*(France*',
+        '*(Germany*',
+        '*(Hong Kong*',
+        '*(Italy*',
+        '*(Korea*',
+        '*(Mexico*',
+        '*(Netherlands*',
+        '*(Russia*',
+        '*(Spain*',
+        '*(Sweden*',
+        '*(Taiwan*',
+        '*(United Kingdom*',
+        '*(Unknown*',
+        )
+
+glob_patterns_territory_nes = tuple(sorted(glob_patterns_territory + (
+        '*(Finland*',
+        '*(Poland*',
+        '*(Scandinavia*',
+        )))
+
+glob_patterns_territory_ms = tuple(sorted(glob_patterns_territory + (
+        '*(Portugal*',
+        )))
+
+'''
+Regex needed for ROMs such as:
+'89 Dennou Kyuusei Uranai (Japan).nes
+M.C. Kids (USA).nes
+M.U.L.E. (USA).nes
+M.U.S.C.L.E. - Tag Team Match (USA).nes
+S.C.A.T. - Special Cybernetic Attack Team (USA).nes
+S.C.A.T. - Special Cybernetic Attack Team (USA, Europe) (Virtual Console).nes
+S.T.I.N.G. (World) (Aftermarket) (Homebrew).nes
+'''
+NES = Profile(
+        name='nes',
+        set_name='Nintendo - Nintendo Entertainment System',
+        rom_ext='nes',
+        glob_patterns_dev_status=glob_patterns_dev_status,
+        glob_patterns_territory=glob_patterns_territory_nes,
+        dir_name_to_pattern={
+                '_BIOS' : r'\./[^[:alnum:]]*\[BIOS\].*\.nes',
+                '0-9'   : r'\./[^[:alnum:]]*[0-9].*\.nes',
+                'A'     : r'\./[^[:alnum:]]*A.*\.nes',
+                'B'     : r'\./[^[:alnum:]]*B.*\.nes',
+                'C'     : r'\./[^[:alnum:]]*C.*\.nes',
+                'D'     : r'\./[^[:alnum:]]*D.*\.nes',
+                'E-F'   : r'\./[^[:alnum:]]*[E-F].*\.nes',
+                'G'     : r'\./[^[:alnum:]]*G.*\.nes',
+                'H'     : r'\./[^[:alnum:]]*H.*\.nes',
+                'I-J'   : r'\./[^[:alnum:]]*[I-J].*\.nes',
+                'K-L'   : r'\./[^[:alnum:]]*[K-L].*\.nes',
+                'Ma-Me' : r'\./[^[:alnum:]]*M[^[:alnum:]]*[a-e].*\.nes',
+                'Mi-My' : r'\./[^[:alnum:]]*M[^[:alnum:]]*[i-y].*\.nes',
+                'N-O'   : r'\./[^[:alnum:]]*[N-O].*\.nes',
+                'P'     : r'\./[^[:alnum:]]*P.*\.nes',
+                'Q-R'   : r'\./[^[:alnum:]]*[Q-R].*\.nes',
+                'Sa-So' : r'\./[^[:alnum:]]*S[^[:alnum:]]*[a-o].*\.nes',
+                'Sp-Sz' : r'\./[^[:alnum:]]*S[^[:alnum:]]*[p-z].*\.nes',
+                'T'     : r'\./[^[:alnum:]]*T.*\.nes',
+                'U-W'   : r'\./[^[:alnum:]]*[U-W].*\.nes',
+                'X-Z'   : r'\./[^[:alnum:]]*[X-Z].*\.nes',
+                },
+        extra_moves=(
+                ExtraMove('Kid Dracula (World) (Castlevania Anniversary Collection).sav', 'K-L',
+                        '# https://forum.no-intro.org/viewtopic.php?t=3856'),
+                ExtraMove('M8 Game Selectable Working Product Display (USA) (Rev B).nes', 'Ma-Me'),
+                ),
+        )
+
+'''
+Regex needed for ROMs such as:
+'96 Zenkoku Koukou Soccer Senshuken (Japan).sfc
+S.O.S - Sink or Swim (USA).sfc
+'''
+SNES = Profile(
+        name='snes',
+        set_name='Nintendo - Super Nintendo Entertainment System',
+        rom_ext='sfc',
+        glob_patterns_dev_status=glob_patterns_dev_status,
+        glob_patterns_territory=glob_patterns_territory,
+        dir_name_to_pattern={
+                # https://en.wikipedia.org/wiki/List_of_Super_NES_enhancement_chips
+                '_Enhancement_Chip' : r'\./.*\(Enhancement Chip\)\.bin',
+
+                '_BIOS' : r'\./[^[:alnum:]]*\[BIOS\].*\.sfc',
+                '0-9'   : r'\./[^[:alnum:]]*[0-9].*\.sfc',
+                'A'     : r'\./[^[:alnum:]]*A.*\.sfc',
+                'B'     : r'\./[^[:alnum:]]*B.*\.sfc',
+                'C'     : r'\./[^[:alnum:]]*C.*\.sfc',
+                'D'     : r'\./[^[:alnum:]]*D.*\.sfc',
+                'E-F'   : r'\./[^[:alnum:]]*[E-F].*\.sfc',
+                'G'     : r'\./[^[:alnum:]]*G.*\.sfc',
+                'H'     : r'\./[^[:alnum:]]*H.*\.sfc',
+                'I-J'   : r'\./[^[:alnum:]]*[I-J].*\.sfc',
+                'K-L'   : r'\./[^[:alnum:]]*[K-L].*\.sfc',
+                'M'     : r'\./[^[:alnum:]]*M.*\.sfc',
+                'N-O'   : r'\./[^[:alnum:]]*[N-O].*\.sfc',
+                'P'     : r'\./[^[:alnum:]]*P.*\.sfc',
+                'Q-R'   : r'\./[^[:alnum:]]*[Q-R].*\.sfc',
+                'Sa-St' : r'\./[^[:alnum:]]*S[^[:alnum:]]*[a-t].*\.sfc',
+                'Su-Sy' : r'\./[^[:alnum:]]*S[^[:alnum:]]*[u-y].*\.sfc',
+                'T'     : r'\./[^[:alnum:]]*T.*\.sfc',
+                'U-W'   : r'\./[^[:alnum:]]*[U-W].*\.sfc',
+                'X-Z'   : r'\./[^[:alnum:]]*[X-Z].*\.sfc',
+                },
+        )
+
+GB = Profile(
+        name='gb',
+        set_name='Nintendo - Game Boy',
+        rom_ext='gb',
+        glob_patterns_dev_status=glob_patterns_dev_status,
+        glob_patterns_territory=glob_patterns_territory,
+        bucket_match='iname',
+        dir_name_to_pattern={
+                '_BIOS' : r'\[BIOS\]*.gb',
+                '0-9'   : r'[0-9]*.gb',
+                'A'     : r'A*.gb',
+                'B'     : r'B*.gb',
+                'C'     : r'C*.gb',
+                'D'     : r'D*.gb',
+                'E-F'   : r'[E-F]*.gb',
+                'G'     : r'G*.gb',
+                'H-J'   : r'[H-J]*.gb',
+                'K-L'   : r'[K-L]*.gb',
+                'M'     : r'M*.gb',
+                'N-O'   : r'[N-O]*.gb',
+                'P'     : r'P*.gb',
+                'Q-R'   : r'[Q-R]*.gb',
+                'Sa-So' : r'S[a-o]*.gb',
+                'Sp-Sz' : r'S[p-z]*.gb',
+                'T'     : r'T*.gb',
+                'U-Z'   : r'[U-Z]*.gb',
+                },
+        )
+
+GBC = Profile(
+        name='gbc',
+        set_name='Nintendo - Game Boy Color',
+        rom_ext='gbc',
+        glob_patterns_dev_status=glob_patterns_dev_status,
+        glob_patterns_territory=glob_patterns_territory,
+        bucket_match='iname',
+        dir_name_to_pattern={
+                '_BIOS' : r'\[BIOS\]*.gbc',
+                '0-9'   : r'[0-9]*.gbc',
+                'A'     : r'A*.gbc',
+                'B'     : r'B*.gbc',
+                'C'     : r'C*.gbc',
+                'D'     : r'D*.gbc',
+                'E-F'   : r'[E-F]*.gbc',
+                'G'     : r'G*.gbc',
+                'H'     : r'H*.gbc',
+                'I-J'   : r'[I-J]*.gbc',
+                'K'     : r'K*.gbc',
+                'L'     : r'L*.gbc',
+                'M'     : r'M*.gbc',
+                'N-O'   : r'[N-O]*.gbc',
+                'P'     : r'P*.gbc',
+                'Q-R'   : r'[Q-R]*.gbc',
+                'Sa-So' : r'S[a-o]*.gbc',
+                'Sp-Sz' : r'S[p-z]*.gbc',
+                'T'     : r'T*.gbc',
+                'U-Z'   : r'[U-Z]*.gbc',
+                },
+        )
+
+GG = Profile(
+        name='gg',
+        set_name='Sega - Game Gear',
+        rom_ext='gg',
+        glob_patterns_dev_status=glob_patterns_dev_status_gg,
+        glob_patterns_territory=glob_patterns_territory,
+        bucket_match='iname',
+        dir_name_to_pattern={
+                '_BIOS' : r'\[BIOS\]*.gg',
+                '0-9'   : r'[0-9]*.gg',
+                'A-B'   : r'[A-B]*.gg',
+                'C-D'   : r'[C-D]*.gg',
+                'E-G'   : r'[E-G]*.gg',
+                'H-L'   : r'[H-L]*.gg',
+                'M-N'   : r'[M-N]*.gg',
+                'O-R'   : r'[O-R]*.gg',
+                'S'     : r'S*.gg',
+                'T-Z'   : r'[T-Z]*.gg',
+                },
+        ext_renames=(
+                ExtRename('sms', 'gg', (
+                        '# https://www.smspower.org/Tags/SMS-GG',
+                        '# "Game Gear games running in Master System compatibility mode."',
+                        )),
+                ),
+        )
+
+MD_GEN = Profile(
+        name='md-gen',
+        set_name='Sega - Mega Drive - Genesis',
+        rom_ext='md',
+        glob_patterns_dev_status=glob_patterns_dev_status_sega,
+        glob_patterns_territory=glob_patterns_territory,
+        bucket_match='iname',
+        dir_name_to_pattern={
+                '_BIOS' : r'\[BIOS\]*.md',
+                '0-9'   : r'[0-9]*.md',
+                'A'     : r'A*.md',
+                'B'     : r'B*.md',
+                'C'     : r'C*.md',
+                'D'     : r'D*.md',
+                'E-F'   : r'[E-F]*.md',
+                'G-H'   : r'[G-H]*.md',
+                'I-J'   : r'[I-J]*.md',
+                'K-L'   : r'[K-L]*.md',
+                'M'     : r'M*.md',
+                'N-O'   : r'[N-O]*.md',
+                'P'     : r'P*.md',
+                'Q-R'   : r'[Q-R]*.md',
+                'Sa-So' : r'S[a-o]*.md',
+                'Sp-Sz' : r'S[p-z]*.md',
+                'T'     : r'T*.md',
+                'U-W'   : r'[U-W]*.md',
+                'X-Z'   : r'[X-Z]*.md',
+                },
+        ext_renames=(
+                ExtRename('bin', 'md'),
+                ),
+        )
+
+MS_M3 = Profile(
+        name='ms-m3',
+        set_name='Sega - Master System - Mark III',
+        rom_ext='sms',
+        glob_patterns_dev_status=glob_patterns_dev_status_sega,
+        glob_patterns_territory=glob_patterns_territory_ms,
+        bucket_match='iname',
+        dir_name_to_pattern={
+                '_BIOS' : r'\[BIOS\]*.sms',
+                #'0-9'   : r'[0-9]*.sms',
+                'A-B'   : r'[A-B]*.sms',
+                'C-F'   : r'[C-F]*.sms',
+                'G-L'   : r'[G-L]*.sms',
+                'M-R'   : r'[M-R]*.sms',
+                'S'     : r'S*.sms',
+                'T-Z'   : r'[T-Z]*.sms',
+                },
+        )
+
+# 32X has so few games that we don't have to put them in subfolders.
+S32X = Profile(
+        name='32x',
+        set_name='Sega - 32X',
+        rom_ext='32x',
+        glob_patterns_dev_status=glob_patterns_dev_status,
+        glob_patterns_territory=glob_patterns_territory,
+        dir_name_to_pattern={},
+        )
+
+PROFILES = {profile.name: profile for profile in (
+        GB,
+        GBC,
+        NES,
+        SNES,
+        S32X,
+        GG,
+        MS_M3,
+        MD_GEN,
+        )}
+
+def get_profile(name: str) -> Profile:
+    '''Get the profile with the given name.'''
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f'Unknown platform: {name!r} (choose from {", ".join(PROFILES)})') from None
@@ -0,0 +1,278 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+
+'''
+Usage: python3 -m organize_roms.quarantine list|purge|restore [--older-than DAYS] [--verbose] ROMS_DIR [RUN...]
+
+Quarantine the ROMs removed by a run instead of deleting them.
+
+With --apply --quarantine, every removed file is renamed into .quarantine/RUN in the ROMs directory
+(RUN is the time of the run). A rename within a filesystem only changes metadata, so it is as fast as an unlink,
+and nothing is lost until the run is purged.
+The bytes and inodes that purging would free are reported for each phase,
+and kept with the names in .quarantine/RUN/.manifest.json.
+
+list     print the runs in quarantine with their files, bytes and inodes
+purge    delete the files of the runs (every run, or those older than DAYS)
+restore  rename the files of the runs back into the ROMs directory (a file that exists there again is kept in quarantine)
+
+Examples:
+python3 -m organize_roms --apply --quarantine nes <base-path-to-roms>/'Nintendo - NES'
+python3 -m organize_roms.quarantine list <base-path-to-roms>/'Nintendo - NES'
+python3 -m organize_roms.quarantine restore <base-path-to-roms>/'Nintendo - NES' 20261018T093000
+python3 -m organize_roms.quarantine purge --older-than 30 <base-path-to-roms>/'Nintendo - NES'
+'''
+
+import argparse
+import json
+import os
+from shlex import quote
+import sys
+import time
+
+from .apply import open_dir
+from .engine import Plan
+
+quarantine_dir_name = '.quarantine'
+
+manifest_name = '.manifest.json'
+
+def file_usage(st: os.stat_result) -> tuple:
+    '''Get the bytes (allocated, if known) and the inodes (0 or 1) that deleting the file would free.'''
+    size = st.st_blocks * 512 if hasattr(st, 'st_blocks') else st.st_size
+    return (size, 1 if st.st_nlink == 1 else 0)
+
+def deletion_usage(plan: Plan, dir_fd: int) -> list:
+    '''Get the comment, files, bytes and inodes of each deletion of the plan.'''
+
+    usage = []
+
+    for deletion in plan.deletions:
+        record = {'comment': deletion.comment, 'names': deletion.names, 'files': len(deletion.names), 'bytes': 0, 'inodes': 0}
+        for name in deletion.names:
+            (size, inodes) = file_usage(os.stat(name, dir_fd=dir_fd, follow_symlinks=False))
+            record['bytes'] += size
+            record['inodes'] += inodes
+        usage.append(record)
+
+    return usage
+
+def prepare(plan: Plan, path = '.') -> tuple:
+    '''Create the quarantine directory of a new run in the ROMs directory, with the manifest of the deletions of the plan.
+
+    Return the directory (relative to the ROMs directory) and the usage of each deletion.
+    '''
+
+    dir_fd = open_dir(path)
+
+    try:
+        try:
+            os.mkdir(quarantine_dir_name, dir_fd=dir_fd)
+        except FileExistsError:
+            pass
+
+        run = time.strftime('%Y%m%dT%H%M%S')
+        run_dir = os.path.join(quarantine_dir_name, run)
+        n = 1
+        while True:
+            try:
+                os.mkdir(run_dir, dir_fd=dir_fd)
+                break
+            except FileExistsError:
+                n += 1
+                run_dir = os.path.join(quarantine_dir_name, f'{run}-{n}')
+
+        usage = deletion_usage(plan, dir_fd)
+
+        fd = os.open(os.path.join(run_dir, manifest_name), os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_CLOEXEC, 0o644, dir_fd=dir_fd)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({
+                    'platform': plan.profile.name,
+                    'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                    'unix_time': time.time(),
+                    'phases': usage,
+                    }, f, indent=1)
+            print(file=f)
+    finally:
+        os.close(dir_fd)
+
+    return (run_dir, usage)
+
+def load_manifest(path, run: str) -> dict:
+    '''Load the manifest of the run in the ROMs directory.'''
+    with open(os.path.join(path, quarantine_dir_name, run, manifest_name), encoding='utf-8') as f:
+        return json.load(f)
+
+def list_runs(path) -> list:
+    '''Get the names of the runs in quarantine in the ROMs directory, oldest first.'''
+    try:
+        with os.scandir(os.path.join(path, quarantine_dir_name)) as it:
+            return sorted(entry.name for entry in it if entry.is_dir(follow_symlinks=False))
+    except FileNotFoundError:
+        return []
+
+def run_usage(path, run: str) -> dict:
+    '''Get the files, bytes and inodes in quarantine of the run.'''
+
+    usage = {'files': 0, 'bytes': 0, 'inodes': 0}
+
+    with os.scandir(os.path.join(path, quarantine_dir_name, run)) as it:
+        for entry in it:
+            if entry.name != manifest_name and entry.is_file(follow_symlinks=False):
+                (size, inodes) = file_usage(entry.stat(follow_symlinks=False))
+                usage['files'] += 1
+                usage['bytes'] += size
+                usage['inodes'] += inodes
+
+    return usage
+
+def purge_run(path, run: str, log = None) -> dict:
+    '''Delete the files of the run in quarantine, then its directory.'''
+
+    usage = run_usage(path, run)
+    run_path = os.path.join(path, quarantine_dir_name, run)
+
+    run_fd = open_dir(run_path)
+    try:
+        for name in os.listdir(run_fd):
+            os.unlink(name, dir_fd=run_fd)
+            if log is not None and name != manifest_name:
+                log(f'removed {name!r}')
+    finally:
+        os.close(run_fd)
+
+    os.rmdir(run_path)
+
+    return usage
+
+def remove_empty_run(run_dir: str, dir_fd: int) -> bool:
+    '''Remove the directory of the run (relative to the ROMs directory) if it only holds its manifest.'''
+
+    run_fd = open_dir(run_dir, dir_fd=dir_fd)
+
+    try:
+        names = os.listdir(run_fd)
+        if any(name != manifest_name for name in names):
+            return False
+        if names: # not empty
+            os.unlink(manifest_name, dir_fd=run_fd)
+    finally:
+        os.close(run_fd)
+
+    os.rmdir(run_dir, dir_fd=dir_fd)
+
+    return True
+
+def restore_run(path, run: str, log = None) -> dict:
+    '''Rename the files of the run in quarantine back into the ROMs directory.
+
+    A file that exists again in the ROMs directory is kept in quarantine.
+    The directory of the run is removed once it is empty.
+    '''
+
+    counts = {'restored': 0, 'kept': 0}
+
+    dir_fd = open_dir(path)
+    run_fd = open_dir(os.path.join(quarantine_dir_name, run), dir_fd=dir_fd)
+
+    try:
+        for name in sorted(os.listdir(run_fd)):
+            if name == manifest_name:
+                continue
+            try:
+                os.stat(name, dir_fd=dir_fd, follow_symlinks=False)
+                counts['kept'] += 1
+                print(f'# Warning: {quote(name)} exists; kept in quarantine', file=sys.stderr)
+                continue
+            except FileNotFoundError:
+                pass
+            os.rename(name, name, src_dir_fd=run_fd, dst_dir_fd=dir_fd)
+            counts['restored'] += 1
+            if log is not None:
+                log(f'restored {name!r}')
+
+        remove_empty_run(os.path.join(quarantine_dir_name, run), dir_fd)
+    finally:
+        os.close(run_fd)
+        os.close(dir_fd)
+
+    return counts
+
+def write_usage(usage: list, file) -> None:
+    '''Write the files, bytes and inodes of each deletion.'''
+    for record in usage:
+        print(f"{record['comment']}: {record['files']} files, {record['bytes']} bytes, {record['inodes']} inodes", file=file)
+
+def parse_args(argv):
+    '''Parse the command line arguments.'''
+
+    parser = argparse.ArgumentParser(
+            prog='organize_roms.quarantine',
+            description='List, purge or restore the runs in quarantine.')
+
+    parser.add_argument('command', choices=('list', 'purge', 'restore'),
+            help='what to do with the runs')
+
+    parser.add_argument('roms_dir',
+            help='directory that contains the ROMs')
+
+    parser.add_argument('runs', nargs='*', metavar='RUN',
+            help='runs to purge or restore (default for list and purge: every run)')
+
+    parser.add_argument('--older-than', type=float, default=None, metavar='DAYS',
+            help='only the runs older than DAYS')
+
+    parser.add_argument('-v', '--verbose', action='store_true',
+            help='print each file to stderr')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'restore' and not args.runs:
+        parser.error('restore needs the runs to restore')
+
+    return args
+
+def log_stderr(message: str) -> None:
+    '''Print the message to stderr.'''
+    print(message, file=sys.stderr)
+
+# pylint: disable=missing-function-docstring
+def main(argv = None):
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    args = parse_args(argv)
+
+    log = log_stderr if args.verbose else None
+
+    try:
+        runs = args.runs or list_runs(args.roms_dir)
+
+        if args.older_than is not None:
+            cutoff = time.time() - args.older_than * 86400
+            runs = [run for run in runs if load_manifest(args.roms_dir, run)['unix_time'] < cutoff]
+
+        for run in runs:
+            if args.command == 'list':
+                manifest = load_manifest(args.roms_dir, run)
+                usage = run_usage(args.roms_dir, run)
+                print(f"{run}  {manifest['platform']:<6} {usage['files']:>6} files {usage['bytes']:>12} bytes {usage['inodes']:>6} inodes")
+            elif args.command == 'purge':
+                usage = purge_run(args.roms_dir, run, log)
+                print(f"{run}: purged {usage['files']} files, {usage['bytes']} bytes, {usage['inodes']} inodes", file=sys.stderr)
+            else:
+                counts = restore_run(args.roms_dir, run, log)
+                print(f"{run}: restored {counts['restored']} files, kept {counts['kept']}", file=sys.stderr)
+
+    except (OSError, ValueError, KeyError) as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
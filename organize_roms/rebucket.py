@@ -0,0 +1,277 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+
+'''
+Usage: python3 -m organize_roms.rebucket [--apply] [--verbose] [--journal FILE] [--jobs N] [--layout FILE] [--flatten | --unflatten] PLATFORM [ROMS_DIR]
+
+Move the files of an organized ROMs directory into the buckets of another bucket table,
+e.g. after a layout change splits 'M' into 'Ma-Me' and 'Mi-My'.
+
+The current layout is read from ROMS_DIR and its buckets (its subdirectories, except hidden ones),
+and only the files whose bucket changed are moved. Buckets left empty are removed.
+No file is removed or renamed: run python3 -m organize_roms first for that.
+
+With --flatten, move every file of the buckets back into ROMS_DIR.
+With --unflatten, move only the files in ROMS_DIR itself into their buckets.
+
+Without --apply, print a shell script to review, then run from within the ROMs directory.
+With --apply --journal, the run can be resumed or undone (see python3 -m organize_roms.journal).
+
+A file with the same name in more than one bucket is left alone (with a warning).
+
+Examples:
+python3 -m organize_roms.layout --max-entries 150 --json --names roms-list/Nintendo-Game-Boy gb > gb-layout.json
+python3 -m organize_roms.rebucket --layout gb-layout.json gb <base-path-to-roms>/'Nintendo - Game Boy' > rebucket.sh
+python3 -m organize_roms.rebucket --apply --flatten nes <base-path-to-roms>/'Nintendo - NES'
+'''
+
+import argparse
+import contextlib
+import os
+from shlex import quote
+import sys
+
+from .apply import run_operations
+from .engine import classify_names, rules_for
+from .journal import Journal
+from .layout import load_layout
+from .profiles import PROFILES, Profile, get_profile
+from .shell import mv_cmd, shebang
+from .zips import inner_names, is_zip, zip_classifier
+
+def read_layout(path = '.') -> tuple:
+    '''Read the current layout of the ROMs directory.
+
+    Return the bucket of each file ('' for the ROMs directory itself),
+    the number of entries of each bucket, and the paths of the files with the same name in more than one bucket.
+    '''
+
+    dirs_of_name = {}
+    entry_counts = {}
+
+    def visit(dir_name):
+        count = 0
+        with os.scandir(os.path.join(path, dir_name)) as it:
+            for entry in it:
+                count += 1
+                if entry.is_file(follow_symlinks=False):
+                    dirs_of_name.setdefault(entry.name, []).append(dir_name)
+                elif not dir_name and not entry.name.startswith('.') and entry.is_dir(follow_symlinks=False):
+                    visit(entry.name)
+        entry_counts[dir_name] = count
+
+    visit('')
+
+    layout = {}
+    duplicates = []
+
+    for (name, dir_names) in dirs_of_name.items():
+        if len(dir_names) == 1:
+            layout[name] = dir_names[0]
+        else:
+            duplicates.extend(os.path.join(dir_name, name) for dir_name in dir_names)
+
+    return (layout, entry_counts, sorted(duplicates))
+
+def new_layout(layout: dict, profile: Profile, path = '.') -> dict:
+    '''Get the bucket of each file in the bucket table of the profile ('' if no bucket matches).
+
+    A zip archive goes into the bucket of the ROM inside it (see zips.py).
+    '''
+
+    rules = rules_for(profile)
+
+    classify = None
+    if any(is_zip(name) for name in layout):
+        names_of_dir = {}
+        for (name, dir_name) in layout.items():
+            names_of_dir.setdefault(dir_name, []).append(name)
+        inner = {}
+        for (dir_name, names) in names_of_dir.items():
+            inner.update(inner_names(os.path.join(path, dir_name), names, profile.rom_ext))
+        classify = zip_classifier(rules.buckets, profile.rom_ext, inner)
+
+    (moves, _) = classify_names(profile, rules, layout.keys(), classify)
+
+    targets = dict.fromkeys(layout, '')
+    for (dir_name, names) in moves.items():
+        for name in names:
+            targets[name] = dir_name
+
+    return targets
+
+def changes(layout: dict, targets: dict, mode: str = 'rebucket') -> dict:
+    '''Get the files to move: the new bucket to the sorted (name, old bucket) moved into it.
+
+    mode is 'rebucket' (every file goes into its bucket), 'flatten' (every file goes into the ROMs directory)
+    or 'unflatten' (only the files in the ROMs directory go into their buckets).
+    '''
+
+    moves = {}
+
+    for (name, old_dir) in layout.items():
+        if mode == 'flatten':
+            new_dir = ''
+        elif mode == 'unflatten' and old_dir:
+            continue
+        else:
+            new_dir = targets[name]
+        if new_dir != old_dir:
+            moves.setdefault(new_dir, []).append((name, old_dir))
+
+    for names in moves.values():
+        names.sort()
+
+    return dict(sorted(moves.items()))
+
+def emptied_dirs(moves: dict, entry_counts: dict) -> list:
+    '''Get the buckets that the moves leave empty.'''
+
+    moved_out = {}
+    for names in moves.values():
+        for (_, old_dir) in names:
+            moved_out[old_dir] = moved_out.get(old_dir, 0) + 1
+
+    return sorted(dir_name for (dir_name, count) in moved_out.items()
+            if dir_name and dir_name not in moves and count == entry_counts[dir_name])
+
+def operations(moves: dict, rmdirs: list) -> list:
+    '''Get the operations (see apply.py) that carry out the moves, then remove the emptied buckets.'''
+
+    ops = []
+
+    for (new_dir, names) in moves.items():
+        if new_dir: # not empty
+            ops.append(('mkdir', new_dir))
+        ops.extend(('rename', os.path.join(old_dir, name), os.path.join(new_dir, name)) for (name, old_dir) in names)
+
+    ops.extend(('rmdir', dir_name) for dir_name in rmdirs)
+
+    return ops
+
+def shell_lines(moves: dict, rmdirs: list):
+    '''Generate the lines of the shell script that carries out the moves, then removes the emptied buckets.'''
+
+    yield shebang
+
+    new_dirs = [new_dir for new_dir in moves if new_dir]
+
+    if new_dirs: # not empty
+        yield ''
+        yield 'mkdir --verbose --parents -- \\'
+        yield ' \\\n'.join(map(quote, new_dirs))
+
+    for (new_dir, names) in moves.items():
+        yield ''
+        yield mv_cmd.format(dir_name=quote(new_dir or '.'))
+        yield from (os.path.join(old_dir, name) for (name, old_dir) in names)
+        yield 'EOT'
+
+    if rmdirs: # not empty
+        yield ''
+        yield 'rmdir --verbose -- \\'
+        yield ' \\\n'.join(map(quote, rmdirs))
+
+def parse_args(argv):
+    '''Parse the command line arguments.'''
+
+    parser = argparse.ArgumentParser(
+            prog='organize_roms.rebucket',
+            description='Move only the files whose bucket changed.')
+
+    parser.add_argument('platform', choices=PROFILES.keys(),
+            help='platform profile')
+
+    parser.add_argument('roms_dir', nargs='?', default='.',
+            help='directory of ROMs (default: %(default)s)')
+
+    mode = parser.add_mutually_exclusive_group()
+
+    mode.add_argument('--flatten', action='store_const', dest='mode', const='flatten', default='rebucket',
+            help='move every file of the buckets into ROMS_DIR')
+
+    mode.add_argument('--unflatten', action='store_const', dest='mode', const='unflatten',
+            help='move only the files in ROMS_DIR into their buckets')
+
+    parser.add_argument('--apply', action='store_true',
+            help='move the files instead of printing a shell script')
+
+    parser.add_argument('--journal', metavar='FILE',
+            help='with --apply, journal the operations in FILE')
+
+    parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+            help='with --apply, the number of threads that carry out the operations, e.g. 16 on a network filesystem (default: %(default)s)')
+
+    parser.add_argument('--layout', metavar='FILE',
+            help='use the bucket table of the layout file')
+
+    parser.add_argument('-v', '--verbose', action='store_true',
+            help='with --apply, print each operation to stderr')
+
+    args = parser.parse_args(argv)
+
+    if args.journal is not None and not args.apply:
+        parser.error('--journal needs --apply')
+
+    return args
+
+def log_stderr(message: str) -> None:
+    '''Print the message to stderr.'''
+    print(message, file=sys.stderr)
+
+# pylint: disable=missing-function-docstring
+def main(argv = None):
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    args = parse_args(argv)
+
+    try:
+        profile = get_profile(args.platform)
+        if args.layout is not None:
+            profile = load_layout(profile, args.layout)
+
+        (layout, entry_counts, duplicates) = read_layout(args.roms_dir)
+        targets = new_layout(layout, profile, args.roms_dir)
+    except (OSError, ValueError) as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+
+    for path in duplicates:
+        print(f'# Warning: {quote(path)} has the same name as a file in another bucket; left alone', file=sys.stderr)
+
+    moves = changes(layout, targets, args.mode)
+    rmdirs = emptied_dirs(moves, entry_counts)
+
+    moved = sum(map(len, moves.values()))
+    log_stderr(f'# {moved} of {len(layout)} files move, {len(rmdirs)} buckets are emptied')
+
+    if not args.apply:
+        for line in shell_lines(moves, rmdirs):
+            print(line)
+        return 0
+
+    ops = operations(moves, rmdirs)
+
+    try:
+        with contextlib.ExitStack() as stack:
+            journal = None
+            if args.journal is not None:
+                journal = stack.enter_context(Journal(args.journal))
+                journal.begin(os.path.realpath(args.roms_dir), ops)
+            counts = run_operations(ops, args.roms_dir, log_stderr if args.verbose else None, journal, jobs=args.jobs)
+    except (OSError, ValueError) as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+
+    if args.verbose:
+        log_stderr(f"{counts['renamed']} moved")
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+
+'''
+Write a plan as a shell script.
+
+The files of each bucket are listed explicitly (the plan already classified them),
+so the script reads the ROMs directory once instead of once per bucket.
+'''
+
+from shlex import quote
+
+from .engine import Plan
+
+# Hopefully no ROM begins with "EOT"
+# The delimiter is quoted so that names such as "Buckeroo$! (USA).nes" are not expanded.
+rm_cmd = "cat <<'EOT' | xargs --no-run-if-empty --delimiter='\\n' --verbose -- rm --verbose || exit"
+
+mv_cmd = "cat <<'EOT' | xargs --no-run-if-empty --delimiter='\\n' --verbose -- mv --verbose --target-directory={dir_name} || exit"
+
+shebang = '#!/usr/bin/sh'
+
+def shell_lines(plan: Plan):
+    '''Generate the lines of the shell script that carries out the plan.'''
+
+    profile = plan.profile
+
+    yield shebang
+
+    for deletion in plan.deletions:
+        yield ''
+        yield deletion.comment
+        yield rm_cmd
+        yield from deletion.names
+        yield 'EOT'
+
+    for ext_rename in profile.ext_renames:
+        yield ''
+        yield from ext_rename.comments
+        yield f'rename -v -o -- .{ext_rename.old_ext} .{ext_rename.new_ext} *.{ext_rename.old_ext}'
+
+    if plan.moves: # not empty
+
+        yield ''
+        yield 'mkdir --verbose --parents -- \\'
+        yield ' \\\n'.join(map(quote, plan.moves.keys()))
+
+        for (dir_name, names) in plan.moves.items():
+            if names: # not empty
+                yield ''
+                yield mv_cmd.format(dir_name=quote(dir_name))
+                yield from names
+                yield 'EOT'
+
+        if plan.unplaced: # not empty
+            yield ''
+            yield '# Files that match no bucket'
+            for name in plan.unplaced:
+                yield '# ' + name
+
+def write_shell(plan: Plan, file) -> None:
+    '''Write the shell script that carries out the plan to the file.'''
+    for line in shell_lines(plan):
+        print(line, file=file)
@@ -0,0 +1,99 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+
+'''
+Measure the phases of a run.
+
+The engine records a phase only when it is given a Stats object,
+so a run without one pays nothing but a test of None per phase.
+
+For each phase: the wall time, the number of names in and out,
+and the peak RSS of the process at the end of the phase.
+With trace_memory, also the peak memory allocated during the phase (tracemalloc; slow).
+For the phases of glob patterns: the number of names that match each pattern.
+'''
+
+import contextlib
+import resource
+import sys
+import time
+
+# pylint: disable=import-outside-toplevel
+# json and tracemalloc are imported when they are used, so a run without stats starts fast.
+
+def max_rss() -> int:
+    '''Get the peak RSS (bytes) of the process so far.'''
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KiB elsewhere
+    return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+class Stats:
+    '''The measurements of the phases of a run.'''
+
+    def __init__(self, trace_memory: bool = False):
+        self.phases = []
+        # phase to glob pattern to the number of matching names
+        self.rules = {}
+        self.trace_memory = trace_memory
+        if trace_memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+    @contextlib.contextmanager
+    def phase(self, name: str, names_in: int = 0):
+        '''Measure the phase in the with block. Set 'names_out' of the yielded record.'''
+
+        record = {'phase': name, 'names_in': names_in, 'names_out': names_in}
+
+        if self.trace_memory:
+            import tracemalloc
+            tracemalloc.reset_peak()
+
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            record['max_rss'] = max_rss()
+            if self.trace_memory:
+                (_, record['traced_peak']) = tracemalloc.get_traced_memory()
+            self.phases.append(record)
+
+    def as_dict(self) -> dict:
+        '''Get the measurements as a dict (for JSON).'''
+        return {'phases': self.phases, 'rules': self.rules}
+
+    def write_json(self, path) -> None:
+        '''Write the measurements as JSON to the file.'''
+        import json
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.as_dict(), f, indent=1)
+            print(file=f)
+
+    def write_text(self, file) -> None:
+        '''Write the measurements as a table to the file.'''
+
+        print(f"# {'phase':<16} {'seconds':>9} {'in':>8} {'out':>8} {'max RSS MiB':>11}"
+                + (f" {'traced MiB':>10}" if self.trace_memory else ''), file=file)
+
+        for record in self.phases:
+            line = (f"# {record['phase']:<16} {record['seconds']:>9.4f} {record['names_in']:>8} "
+                    f"{record['names_out']:>8} {record['max_rss'] / 2**20:>11.1f}")
+            if 'traced_peak' in record:
+                line += f" {record['traced_peak'] / 2**20:>10.1f}"
+            print(line, file=file)
+
+        for (phase_name, counts) in self.rules.items():
+            print(f'# {phase_name} matches per rule', file=file)
+            for (glob_pattern, count) in counts.items():
+                print(f'#   {glob_pattern:<24} {count:>8}', file=file)
+
+def phase(stats, name: str, names_in: int = 0):
+    '''Measure the phase if stats is not None.'''
+    if stats is None:
+        return contextlib.nullcontext({})
+    return stats.phase(name, names_in)
@@ -0,0 +1,266 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+
+'''
+Usage: python3 -m organize_roms.verify [--jobs N] [--json FILE] [--quiet] [--hash-cache FILE] DAT_FILE [ROMS_DIR]
+
+Verify the ROMs in ROMS_DIR (default: the current directory) and its buckets against a No-Intro DAT (XML).
+
+Each file is read once; its CRC32, MD5 and SHA-1 are computed in the same pass.
+Files are hashed concurrently (--jobs threads; hashlib and zlib release the GIL on large buffers).
+
+For each file, print its status:
+have    the DAT has the name and every digest matches
+bad     the DAT has the name but the size or a digest differs
+unknown the DAT does not have the name (if the contents match another ROM of the DAT, it is named)
+unreadable the file cannot be read (e.g. no permission, or removed during the run)
+
+With --hash-cache, the digests are kept in an SQLite file (see hashcache.py),
+and only new or changed files are read.
+
+The ROMs in a zip archive are checked by the size and CRC32 in the central directory of the archive, without decompressing it.
+
+The exit status is 1 if any file is bad or unreadable.
+
+Examples:
+python3 -m organize_roms.verify 'Nintendo - Nintendo Entertainment System (Headered) (20230318-071435).dat' <base-path-to-roms>/'Nintendo - NES'
+python3 -m organize_roms.verify --quiet --hash-cache ~/.cache/roms-hashes.sqlite --json verify.json nes.dat
+'''
+
+import argparse
+import concurrent.futures
+import contextlib
+from dataclasses import dataclass
+import json
+import os
+from shlex import quote
+import sys
+import xml.etree.ElementTree as ET
+import zipfile
+
+from .digests import Digests, hash_file
+from .hashcache import HashCache, same_file
+from .zips import is_zip, zip_digests
+
+@dataclass
+class Dat:
+    '''The ROMs of a DAT.'''
+    name: str
+    # ROM name to Digests
+    roms: dict
+    # SHA-1, and (CRC32, size), to ROM name
+    contents: dict
+
+def load_dat(path) -> Dat:
+    '''Load a DAT (Logiqx XML, as used by No-Intro).
+
+    The XML is parsed incrementally; each game is dropped once its ROMs are read.
+    '''
+
+    name = None
+    roms = {}
+    contents = {}
+
+    for (_, elem) in ET.iterparse(path):
+        if elem.tag == 'name' and name is None:
+            name = elem.text
+        elif elem.tag == 'rom':
+            attrib = elem.attrib
+            digests = Digests(
+                    int(attrib.get('size', -1)),
+                    attrib.get('crc', '').lower(),
+                    attrib['md5'].lower() if 'md5' in attrib else None,
+                    attrib['sha1'].lower() if 'sha1' in attrib else None)
+            roms[attrib['name']] = digests
+            if digests.sha1 is not None:
+                contents.setdefault(digests.sha1, attrib['name'])
+            contents.setdefault((digests.crc, digests.size), attrib['name'])
+        elif elem.tag in ('game', 'machine'):
+            elem.clear()
+
+    return Dat(name, roms, contents)
+
+def check(dat: Dat, name: str, digests: Digests) -> tuple:
+    '''Get the status and the detail of a ROM.'''
+
+    expected = dat.roms.get(name)
+
+    if expected is None:
+        other = dat.contents.get(digests.sha1) if digests.sha1 is not None else None
+        if other is None:
+            other = dat.contents.get((digests.crc, digests.size))
+        return ('unknown', '' if other is None else f'matches {other}')
+
+    mismatches = [field for field in ('size', 'crc', 'md5', 'sha1')
+            if getattr(expected, field) not in (None, -1, '')
+            and getattr(digests, field) is not None
+            and getattr(expected, field) != getattr(digests, field)]
+
+    if mismatches: # not empty
+        return ('bad', ', '.join(mismatches) + ' differ')
+
+    return ('have', '')
+
+def find_files(path) -> list:
+    '''Get the paths of the files in the path and its subdirectories (the buckets), sorted.
+
+    Hidden subdirectories (e.g. .quarantine) are skipped.
+    '''
+
+    paths = []
+
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_file(follow_symlinks=False):
+                paths.append(entry.path)
+            elif not entry.name.startswith('.') and entry.is_dir(follow_symlinks=False):
+                paths.extend(find_files(entry.path))
+
+    return sorted(paths)
+
+def verify(dat: Dat, paths, hasher = hash_file, jobs = None, cache = None):
+    '''Generate the (path, status, detail, digests) of the files, in the order they are hashed.
+
+    With a hash cache, the cached files are not read,
+    and the digests of the other files are cached if the file did not change while it was read.
+    The cache is only used from this thread.
+
+    The files in a zip archive are checked by the size and CRC32 in its central directory;
+    the path of each is the path of the archive joined with the name of the file.
+
+    A file that cannot be read is 'unreadable' (the detail is the error), and the other files are still checked.
+    '''
+
+    def unreadable(path, e):
+        return (path, 'unreadable', e.strerror or str(e), Digests(-1, ''))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+
+        futures = {}
+
+        for path in paths:
+            st = None
+            if is_zip(path):
+                futures[executor.submit(zip_digests, path)] = (path, None)
+                continue
+            if cache is not None:
+                try:
+                    st = os.stat(path, follow_symlinks=False)
+                except OSError as e:
+                    yield unreadable(path, e)
+                    continue
+                digests = cache.get(st)
+                if digests is not None:
+                    yield (path, *check(dat, os.path.basename(path), digests), digests)
+                    continue
+            futures[executor.submit(hasher, path)] = (path, st)
+
+        for future in concurrent.futures.as_completed(futures):
+            (path, st) = futures[future]
+            if is_zip(path):
+                try:
+                    members = future.result()
+                except zipfile.BadZipFile as e:
+                    yield (path, 'bad', str(e), Digests(os.path.getsize(path), ''))
+                    continue
+                except OSError as e:
+                    yield unreadable(path, e)
+                    continue
+                for (name, digests) in members:
+                    (status, detail) = check(dat, os.path.basename(name), digests)
+                    yield (os.path.join(path, name), status, detail, digests)
+                continue
+            try:
+                digests = future.result()
+                if cache is not None and same_file(st, os.stat(path, follow_symlinks=False)):
+                    cache.put(st, digests)
+            except OSError as e:
+                yield unreadable(path, e)
+                continue
+            (status, detail) = check(dat, os.path.basename(path), digests)
+            yield (path, status, detail, digests)
+
+def parse_args(argv):
+    '''Parse the command line arguments.'''
+
+    parser = argparse.ArgumentParser(
+            prog='organize_roms.verify',
+            description='Verify ROMs against a No-Intro DAT.')
+
+    parser.add_argument('dat_file',
+            help='No-Intro DAT (XML)')
+
+    parser.add_argument('roms_dir', nargs='?', default='.',
+            help='directory that contains the ROMs (default: the current directory)')
+
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), metavar='N',
+            help='number of hashing threads (default: %(default)s)')
+
+    parser.add_argument('--json', metavar='FILE',
+            help='save the status and the digests of every file as JSON')
+
+    parser.add_argument('--hash-cache', metavar='FILE',
+            help='SQLite cache of the digests of unchanged files')
+
+    parser.add_argument('-q', '--quiet', action='store_true',
+            help='print only the files that are not "have"')
+
+    return parser.parse_args(argv)
+
+# pylint: disable=missing-function-docstring
+def main(argv = None):
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    args = parse_args(argv)
+
+    try:
+        dat = load_dat(args.dat_file)
+        paths = find_files(args.roms_dir)
+    except (OSError, ET.ParseError) as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+
+    totals = {'have': 0, 'bad': 0, 'unknown': 0, 'unreadable': 0}
+    records = []
+
+    try:
+        with contextlib.ExitStack() as stack:
+            cache = None
+            if args.hash_cache is not None:
+                cache = stack.enter_context(HashCache(args.hash_cache))
+            for (path, status, detail, digests) in verify(dat, paths, jobs=args.jobs, cache=cache):
+                totals[status] += 1
+                records.append({'path': path, 'status': status, 'detail': detail, **digests.__dict__})
+            if cache is not None:
+                print(f'# hash cache: {cache.hits} hits, {cache.misses} misses', file=sys.stderr)
+    except OSError as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+
+    records.sort(key=lambda record: record['path'])
+
+    for record in records:
+        if args.quiet and record['status'] == 'have':
+            continue
+        line = f"{record['status']:<10} {quote(os.path.relpath(record['path'], args.roms_dir))}"
+        if record['detail']: # not empty
+            line += f"  # {record['detail']}"
+        print(line)
+
+    if args.json is not None:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'dat': dat.name, 'totals': totals, 'files': records}, f, indent=1)
+            print(file=f)
+
+    print(f"# {dat.name}: {totals['have']} have, {totals['bad']} bad, {totals['unknown']} unknown, "
+            f"{totals['unreadable']} unreadable", file=sys.stderr)
+
+    return 1 if totals['bad'] or totals['unreadable'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,211 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+
+'''
+Watch a ROMs directory and organize new files as they land (Linux only).
+
+New files are noticed with inotify (through ctypes) when they are closed after writing or moved in.
+Events are debounced, then only the new names are planned and applied.
+Superseding still sees the whole collection: the names already in the ROMs directory and its buckets
+are indexed by title at startup, and the new names are planned together with the known names of the same titles.
+'''
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+
+from .apply import apply_plan
+from .engine import Deletion, Plan, organize, rules_for, scan
+from .names import parse
+from .profiles import Profile
+from .zips import inner_names, is_zip, zip_classifier
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO    = 0x00000080
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF   = 0x00000800
+IN_Q_OVERFLOW  = 0x00004000
+IN_IGNORED     = 0x00008000
+IN_ONLYDIR     = 0x01000000
+IN_CLOEXEC     = 0o2000000
+IN_NONBLOCK    = 0o0004000
+
+event_header = struct.Struct('iIII')
+
+class Inotify:
+    '''An inotify instance watching one directory.'''
+
+    def __init__(self, path, mask: int):
+
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+
+        try:
+            inotify_init1 = libc.inotify_init1
+            inotify_add_watch = libc.inotify_add_watch
+        except AttributeError:
+            raise OSError('inotify is not available') from None
+
+        inotify_init1.argtypes = (ctypes.c_int,)
+        inotify_add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+
+        self.fd = inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd == -1:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+        if inotify_add_watch(self.fd, os.fsencode(path), mask | IN_ONLYDIR) == -1:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, os.strerror(errno), path)
+
+    def close(self) -> None:
+        '''Close the inotify instance.'''
+        os.close(self.fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def wait(self, timeout = None) -> bool:
+        '''Wait until an event can be read (or the timeout in seconds passes).'''
+        (readable, _, _) = select.select((self.fd,), (), (), timeout)
+        return bool(readable)
+
+    def read(self):
+        '''Generate the (mask, name) of the pending events.'''
+
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return
+
+            offset = 0
+            while offset < len(buf):
+                (_, mask, _, length) = event_header.unpack_from(buf, offset)
+                offset += event_header.size
+                name = os.fsdecode(buf[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                yield (mask, name)
+
+class Watcher:
+    '''Organize the new files of a ROMs directory.'''
+
+    def __init__(self, path, profile: Profile, log = None):
+        self.path = path
+        self.profile = profile
+        self.log = log
+        # name to the bucket it is in ('' for the ROMs directory)
+        self.locations = {}
+        # title to the known names
+        self.titles = {}
+
+    def add(self, name: str, dir_name: str) -> None:
+        '''Add the name to the index.'''
+        self.locations[name] = dir_name
+        self.titles.setdefault(parse(name).title, set()).add(name)
+
+    def discard(self, name: str) -> None:
+        '''Remove the name from the index.'''
+        if self.locations.pop(name, None) is not None:
+            self.titles[parse(name).title].discard(name)
+
+    def build_index(self) -> None:
+        '''Index the names already in the buckets.'''
+
+        self.locations.clear()
+        self.titles.clear()
+
+        dir_names = set(rules_for(self.profile).buckets.dir_names)
+        dir_names.update(extra_move.dir_name for extra_move in self.profile.extra_moves)
+
+        for dir_name in dir_names:
+            try:
+                names = scan(os.path.join(self.path, dir_name))
+            except FileNotFoundError:
+                continue
+            for name in names:
+                self.add(name, dir_name)
+
+    def process(self, names) -> dict:
+        '''Plan and apply the new names (in the ROMs directory) together with the known names of the same titles.'''
+
+        names = set(names).intersection(scan(self.path))
+        if not names: # empty
+            return {}
+
+        context = set()
+        for name in names:
+            context.update(self.titles.get(parse(name).title, ()))
+        context.difference_update(names)
+
+        # Only the new names are moved, so only their zip archives are looked into.
+        classify = None
+        if any(is_zip(name) for name in names):
+            classify = zip_classifier(rules_for(self.profile).buckets, self.profile.rom_ext,
+                    inner_names(self.path, names, self.profile.rom_ext))
+
+        plan = organize(names | context, self.profile, classify)
+
+        # Only the new names are renamed and moved.
+        # A known name may be removed by superseding; it is removed from its bucket.
+        batch_plan = Plan(self.profile, kept=plan.kept & names)
+        for deletion in plan.deletions:
+            batch_plan.deletions.append(Deletion(deletion.comment,
+                    [os.path.join(self.locations.get(name, ''), name) for name in deletion.names]))
+        batch_plan.renames = [(old_name, new_name) for (old_name, new_name) in plan.renames if old_name in names]
+        renamed = {new_name for (_, new_name) in batch_plan.renames}
+        new_names = (names | renamed).difference(old_name for (old_name, _) in batch_plan.renames)
+        batch_plan.moves = {dir_name: [name for name in bucket_names if name in new_names]
+                for (dir_name, bucket_names) in plan.moves.items()}
+        batch_plan.unplaced = [name for name in plan.unplaced if name in new_names]
+
+        counts = apply_plan(batch_plan, self.path, self.log)
+
+        for deletion in plan.deletions:
+            for name in deletion.names:
+                self.discard(name)
+        for (dir_name, bucket_names) in batch_plan.moves.items():
+            for name in bucket_names:
+                self.add(name, dir_name)
+        for name in batch_plan.unplaced:
+            self.add(name, '')
+
+        return counts
+
+    def run(self, debounce: float = 1.0) -> None:
+        '''Organize the ROMs directory, then organize new files until interrupted.'''
+
+        with Inotify(self.path, IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF) as inotify:
+
+            self.build_index()
+            self.process(scan(self.path))
+
+            pending = set()
+
+            while True:
+
+                # Block without a timeout while idle; wait for a quiet period once events arrive.
+                if not inotify.wait(debounce if pending else None):
+                    counts = self.process(pending)
+                    if counts and self.log is not None:
+                        self.log(', '.join(f'{count} {key}' for (key, count) in counts.items()))
+                    pending = set()
+                    continue
+
+                for (mask, name) in inotify.read():
+                    if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                        return
+                    if mask & IN_Q_OVERFLOW:
+                        # Events were lost; look at the whole directory.
+                        self.build_index()
+                        pending.update(scan(self.path))
+                    elif name:
+                        pending.add(name)
@@ -0,0 +1,94 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+
+'''
+Look into zip archives (many sets are distributed as one ROM per zip) without decompressing them.
+
+zipfile reads only the central directory at the end of the archive,
+which has the name, size and CRC32 of every member.
+The bucket of a zip archive is the bucket of the ROM inside it
+(an archive that cannot be read is left unplaced for review),
+and the verifier checks the members against the DAT by their size and CRC32.
+'''
+
+import os
+import sys
+
+from .buckets import Buckets
+
+# pylint: disable=import-outside-toplevel
+# zipfile (and hashlib, for Digests) is imported when an archive is opened, so a run without zips starts fast.
+
+def is_zip(name: str) -> bool:
+    '''Check if the file name is of a zip archive.'''
+    return name[-4:].casefold() == '.zip'
+
+def zip_members(path) -> list:
+    '''Get the ZipInfo of the files in the zip archive (from its central directory).'''
+    import zipfile
+    with zipfile.ZipFile(path) as zf:
+        return [info for info in zf.infolist() if not info.is_dir()]
+
+def zip_digests(path) -> list:
+    '''Get the (name, Digests) of the files in the zip archive. Only the size and CRC32 are known.'''
+    from .digests import Digests
+    return [(info.filename, Digests(info.file_size, f'{info.CRC:08x}')) for info in zip_members(path)]
+
+def inner_name(path, rom_ext: str):
+    '''Get the name of the ROM in the zip archive: the first file with the ROM extension, else the first file (None if empty).'''
+
+    names = [os.path.basename(info.filename) for info in zip_members(path)]
+    suffix = '.' + rom_ext.casefold()
+
+    for name in names:
+        if name[-len(suffix):].casefold() == suffix:
+            return name
+
+    return names[0] if names else None
+
+def inner_names(path, names, rom_ext: str) -> dict:
+    '''Get the name of the ROM in each zip archive of the names in the path.
+
+    The name is None for an archive that cannot be read (with a warning) or is empty,
+    so the archive matches no bucket and is left for review.
+    '''
+
+    import zipfile
+
+    inner = {}
+
+    for name in names:
+        if not is_zip(name):
+            continue
+        try:
+            inner[name] = inner_name(os.path.join(path, name), rom_ext)
+        except (OSError, zipfile.BadZipFile) as e:
+            print(f'# Warning: Cannot read the zip archive {name!r}: {e}', file=sys.stderr)
+            inner[name] = None
+
+    return inner
+
+def zip_classifier(buckets: Buckets, rom_ext: str, inner = None):
+    '''Get a classify function that buckets a zip archive by the ROM inside it.
+
+    An archive whose inner name is None (see inner_names) matches no bucket.
+    An archive not in inner (e.g. from a listing) is assumed to hold a ROM with the stem of the archive.
+    '''
+
+    if inner is None:
+        inner = {}
+
+    def classify(name):
+        if is_zip(name):
+            if name in inner:
+                name = inner[name]
+                if name is None:
+                    return None
+            else:
+                name = name[:-4] + '.' + rom_ext
+        return buckets.classify(name)
+
+    return classify
@@ -5,10 +5,19 @@
 # pylint: disable=invalid-name
 
 '''
-Usage: python3 roms-distribution.py ROMS_DIR...
+Usage: python3 roms-distribution.py [--depth N] [--bytes] [--json] [--recursive] [--jobs N] ROMS_DIR...
 
 For each ROMS_DIR, print the distribution of the first alpha-numeric character of the filenames.
-The results are used to determine an optimal subdirectory structure into which ROMs could be split.
+The results are used to determine an optimal subdirectory structure into which ROMs could be split
+(see also python3 -m organize_roms.layout).
+
+With --depth 2 or 3, count the first 2 or 3 alpha-numeric characters (e.g. Ma, Sup) instead.
+With --bytes, also sum the sizes of the files.
+With --json, print the distributions as JSON.
+With --recursive, also count every directory below each ROMS_DIR (each directory separately).
+
+The directories are read concurrently (--jobs threads).
+A ROMS_DIR may also be a listing of file names (e.g. roms-list/Nintendo-Game-Boy); its sizes are unknown.
 
 Examples:
 python3 roms-distribution.py \
@@ -30,96 +39,192 @@ python3 roms-distribution.py \
 <base-path-to-roms>/'Sega - Game Gear/Sega - Game Gear '* \
 <base-path-to-roms>/'Sega - Master System - Mark III/Sega - Master System - Mark III '* \
 <base-path-to-roms>/'Sega - Mega Drive - Genesis/Sega - Mega Drive - Genesis '*
+
+python3 roms-distribution.py --depth 2 --bytes --json --recursive <base-path-to-roms> > distribution.json
 '''
 
 __author__ = 'Steven Ward'
-__version__ = '2022-10-03'
+__version__ = '2026-10-18'
 __license__ = 'OSL-3.0'
 
+import argparse
+import concurrent.futures
+import json
+import os
 from shlex import quote
-from collections import OrderedDict
-from pathlib import Path
+import string
 import sys
 
-def get_first_alnum(s: str):
-    '''Find the first alpha-numeric character in the string.'''
-    for c in s:
-        if c.isalnum():
-            return c
-    return None
-
-def roms_distribution(path: Path) -> OrderedDict:
-    '''Get the distribution of the first alpha-numeric character of the filenames in the path.'''
-
-    bios_pattern = '[BIOS]'
-    num_pattern = '[0-9]'
-
-    dist = OrderedDict()
-
-    dist[bios_pattern] = 0
-    dist[num_pattern] = 0
-    dist['A'] = 0
-    dist['B'] = 0
-    dist['C'] = 0
-    dist['D'] = 0
-    dist['E'] = 0
-    dist['F'] = 0
-    dist['G'] = 0
-    dist['H'] = 0
-    dist['I'] = 0
-    dist['J'] = 0
-    dist['K'] = 0
-    dist['L'] = 0
-    dist['M'] = 0
-    dist['N'] = 0
-    dist['O'] = 0
-    dist['P'] = 0
-    dist['Q'] = 0
-    dist['R'] = 0
-    dist['S'] = 0
-    dist['T'] = 0
-    dist['U'] = 0
-    dist['V'] = 0
-    dist['W'] = 0
-    dist['X'] = 0
-    dist['Y'] = 0
-    dist['Z'] = 0
-
-    for child in path.iterdir():
-        if child.is_file():
-            s = child.stem
-            key = None
-            if s.startswith(bios_pattern):
-                key = bios_pattern
-            else:
-                first_alnum = get_first_alnum(s.casefold())
-                if first_alnum is None:
-                    print(f'# Warning: No alpha-numeric characters found in {quote(s)}', file=sys.stderr)
-                    continue
-                if first_alnum.isalpha():
-                    key = first_alnum.upper()
-                else: # isdecimal or isdigit or isnumeric
-                    key = num_pattern
-            dist[key] += 1
+from organize_roms.layout import alnum_prefix
+from organize_roms.listing import read_names
+
+bios_pattern = '[BIOS]'
+num_pattern = '[0-9]'
+
+def get_key(name: str, depth: int):
+    '''Get the key of the distribution of the filename (None if it has no alpha-numeric characters).'''
+
+    s = os.path.splitext(name)[0]
+
+    if s.startswith(bios_pattern):
+        return bios_pattern
+
+    prefix = alnum_prefix(s, depth)
+    if not prefix: # empty
+        return None
+
+    if not prefix[0].isalpha(): # isdecimal or isdigit or isnumeric
+        return num_pattern
+
+    return prefix[0].upper() + prefix[1:]
+
+def new_distribution(depth: int) -> dict:
+    '''Get an empty distribution. With depth 1, every letter is present.'''
+
+    dist = dict.fromkeys((bios_pattern, num_pattern), 0)
+
+    if depth == 1:
+        dist.update(dict.fromkeys(string.ascii_uppercase, 0))
 
     return dist
 
+def roms_distribution(path: str, depth: int = 1, weigh_bytes: bool = False) -> tuple:
+    '''Get the distribution of the first alpha-numeric characters of the filenames in the path.
+
+    Return the count and the bytes (None unless weigh_bytes) of each key, and the subdirectories.
+    The type of each entry comes from the directory entry (d_type); only the sizes need a stat.
+    '''
+
+    counts = new_distribution(depth)
+    sizes = new_distribution(depth) if weigh_bytes else None
+    subdirs = []
+
+    def add(name: str, size: int) -> None:
+        key = get_key(name, depth)
+        if key is None:
+            print(f'# Warning: No alpha-numeric characters found in {quote(name)}', file=sys.stderr)
+            return
+        counts[key] = counts.get(key, 0) + 1
+        if sizes is not None:
+            sizes[key] = sizes.get(key, 0) + size
+
+    if not os.path.isdir(path):
+        # a listing of file names
+        with open(path, 'rb') as f:
+            for name in read_names(f):
+                add(name, 0)
+        return (counts, sizes, subdirs)
+
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_file():
+                add(entry.name, entry.stat().st_size if weigh_bytes else 0)
+            elif entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+
+    return (counts, sizes, subdirs)
+
+def sorted_distribution(dist: dict) -> dict:
+    '''Get the distribution with the keys of letters sorted (after [BIOS] and [0-9]).'''
+    keys = list(dist)
+    return {key: dist[key] for key in keys[:2] + sorted(keys[2:])}
+
+def parse_args(argv):
+    '''Parse the command line arguments.'''
+
+    parser = argparse.ArgumentParser(
+            description='Print the distribution of the first alpha-numeric character of the filenames.')
+
+    parser.add_argument('roms_dirs', nargs='+', metavar='ROMS_DIR',
+            help='directory that contains the ROMs (or a listing of file names)')
+
+    parser.add_argument('-d', '--depth', type=int, choices=(1, 2, 3), default=1,
+            help='number of alpha-numeric characters to count (default: %(default)s)')
+
+    parser.add_argument('-b', '--bytes', action='store_true',
+            help='also sum the sizes of the files')
+
+    parser.add_argument('--json', action='store_true',
+            help='print the distributions as JSON')
+
+    parser.add_argument('-r', '--recursive', action='store_true',
+            help='also count the directories below each ROMS_DIR')
+
+    parser.add_argument('-j', '--jobs', type=int, default=None, metavar='N',
+            help='number of threads (default: %(default)s, i.e. chosen by Python)')
+
+    return parser.parse_args(argv)
+
 # pylint: disable=missing-function-docstring
 def main(argv = None):
 
     if argv is None:
         argv = sys.argv[1:]
 
-    for arg in argv:
-        print(f'# {arg}')
+    args = parse_args(argv)
+
+    results = {}
+    errors = 0
 
-        dist = roms_distribution(Path(arg))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.jobs) as executor:
 
-        key_max_len = len(max(dist.keys(), key=len))
+        def submit(path):
+            return executor.submit(roms_distribution, path, args.depth, args.bytes)
 
-        for key, val in dist.items():
-            print(f"{key:<{key_max_len}} {val}")
+        pending = {submit(arg): arg for arg in args.roms_dirs}
+
+        while pending: # not empty
+            (done, _) = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                try:
+                    (counts, sizes, subdirs) = future.result()
+                except OSError as e:
+                    print(f'Error: {e}', file=sys.stderr)
+                    errors += 1
+                    continue
+                results[path] = (counts, sizes)
+                if args.recursive:
+                    for subdir in subdirs:
+                        pending[submit(subdir)] = subdir
+
+    # the arguments in order, each followed by the directories below it
+    paths = []
+    for arg in args.roms_dirs:
+        below = sorted(path for path in results if path.startswith(os.path.join(arg, '')))
+        paths.extend(path for path in [arg] + below if path in results and path not in paths)
+
+    if args.json:
+        json.dump([
+                {
+                        'path': path,
+                        'depth': args.depth,
+                        'count': sorted_distribution(results[path][0]),
+                        'bytes': None if results[path][1] is None else sorted_distribution(results[path][1]),
+                        }
+                for path in paths], sys.stdout, indent=1)
+        print()
+        return 1 if errors else 0
+
+    for path in paths:
+        (counts, sizes) = results[path]
+        if args.recursive and not any(counts.values()):
+            continue
+
+        print(f'# {path}')
+
+        counts = sorted_distribution(counts)
+
+        key_max_len = len(max(counts.keys(), key=len))
+
+        for key, val in counts.items():
+            if sizes is None:
+                print(f"{key:<{key_max_len}} {val}")
+            else:
+                print(f"{key:<{key_max_len}} {val} {sizes[key]}")
         print()
 
+    return 1 if errors else 0
+
 if __name__ == '__main__':
     sys.exit(main())
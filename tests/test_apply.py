@@ -0,0 +1,76 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+# pylint: disable=missing-function-docstring
+
+'''
+Tests of carrying out operations in this process, in one thread and in a pool of threads.
+'''
+
+import os
+import threading
+
+import pytest
+
+from organize_roms.apply import run_operations
+
+def make_files(path, names) -> None:
+    for name in names:
+        (path / name).touch()
+
+def move_ops(names) -> list:
+    '''Move every name into the bucket of its first letter.'''
+    ops = []
+    for dir_name in sorted({name[0] for name in names}):
+        ops.append(('mkdir', dir_name))
+        ops.extend(('move', name, dir_name) for name in sorted(names) if name[0] == dir_name)
+    return ops
+
+def run_with_timeout(function, timeout: float = 30):
+    '''Call the function in a thread; fail if it does not return in time (e.g. a deadlock).'''
+
+    result = {}
+
+    def target():
+        try:
+            result['value'] = function()
+        except BaseException as e: # pylint: disable=broad-exception-caught
+            result['error'] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+
+    assert not thread.is_alive(), 'hung'
+
+    if 'error' in result:
+        raise result['error']
+
+    return result['value']
+
+names = [f'{letter}{i:03}.rom' for letter in 'ABCDEFGH' for i in range(50)]
+
+@pytest.mark.parametrize('jobs', [1, 2, 8])
+def test_run_operations(tmp_path, jobs):
+    make_files(tmp_path, names)
+
+    counts = run_with_timeout(lambda: run_operations(move_ops(names), tmp_path, jobs=jobs))
+
+    assert counts == {'removed': 0, 'renamed': 0, 'moved': len(names)}
+    assert sorted(os.listdir(tmp_path)) == list('ABCDEFGH')
+    assert sorted(os.listdir(tmp_path / 'C')) == [name for name in names if name[0] == 'C']
+
+@pytest.mark.parametrize('jobs', [1, 2, 8])
+def test_run_operations_error(tmp_path, jobs):
+    make_files(tmp_path, names)
+    missing = names[123]
+    os.unlink(tmp_path / missing)
+
+    with pytest.raises(FileNotFoundError):
+        run_with_timeout(lambda: run_operations(move_ops(names), tmp_path, jobs=jobs))
+
+    if jobs == 1:
+        # Stop at the first error, like the shell script.
+        assert (tmp_path / names[124]).exists()
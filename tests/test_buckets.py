@@ -0,0 +1,130 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+# pylint: disable=missing-function-docstring
+
+'''
+Tests of translating the find(1) patterns of the bucket tables, and of classifying names with them.
+'''
+
+import os
+from pathlib import Path
+import re
+import shutil
+import subprocess
+
+import pytest
+
+from organize_roms.buckets import Buckets, translate_find_glob, translate_find_regex
+from organize_roms.profiles import PROFILES, get_profile
+
+roms_list_dir = Path(__file__).resolve().parent.parent / 'roms-list'
+
+# profile name to roms-list file
+fixtures = {
+        'gb'     : 'Nintendo-Game-Boy',
+        'gbc'    : 'Nintendo-Game-Boy-Color',
+        'nes'    : 'Nintendo-Nintendo-Entertainment-System-headered',
+        'snes'   : 'Nintendo-Super-Nintendo-Entertainment-System',
+        '32x'    : 'Sega-32X',
+        'gg'     : 'Sega-Game-Gear',
+        'ms-m3'  : 'Sega-Master-System-Mark-III',
+        'md-gen' : 'Sega-Mega-Drive-Genesis',
+        }
+
+def glob_match(pattern: str, name: str) -> bool:
+    return re.fullmatch(translate_find_glob(pattern), name, re.IGNORECASE | re.DOTALL) is not None
+
+@pytest.mark.parametrize(('pattern', 'name', 'expected'), [
+        ('A*.gb', 'Alleyway (World).gb', True),
+        ('A*.gb', 'alleyway (World).gb', True),
+        ('A*.gb', 'Alleyway (World).gbc', False),
+        ('[E-F]*.gb', 'F-1 Race (World).gb', True),
+        ('[E-F]*.gb', 'G (World).gb', False),
+        ('S[a-o]*.gb', 'Super Mario Land (World).gb', False),
+        ('S[p-z]*.gb', 'Super Mario Land (World).gb', True),
+        ('[!A-Z]*.gb', '4-in-1 Fun Pak (USA).gb', True),
+        ('[!A-Z]*.gb', 'Tetris (World).gb', False),
+        (r'\[BIOS\]*.gb', '[BIOS] Nintendo Game Boy Boot ROM (World).gb', True),
+        (r'\[BIOS\]*.gb', 'B (World).gb', False),
+        ('?.gb', 'Q.gb', True),
+        ('?.gb', 'QQ.gb', False),
+        ('[abc', '[abc', True),
+        ('*.gb', 'a.b.gb', True),
+        ('*.g+b', 'x.g+b', True),
+        ('*.g+b', 'x.ggb', False),
+        ])
+def test_translate_find_glob(pattern, name, expected):
+    assert glob_match(pattern, name) == expected
+
+def test_translate_find_regex():
+    assert translate_find_regex(r'\./[^[:alnum:]]*M[^[:alnum:]]*[a-e].*\.nes') == r'\./[\W_]*M[\W_]*[a-e].*\.nes'
+    with pytest.raises(ValueError):
+        translate_find_regex(r'\./[[:space:]].*\.nes')
+
+@pytest.mark.parametrize(('name', 'dir_name'), [
+        ('Mega Man (USA).nes', 'Ma-Me'),
+        ('M.C. Kids (USA).nes', 'Ma-Me'),
+        ('Mike Tyson\'s Punch-Out!! (USA).nes', 'Mi-My'),
+        ('\'89 Dennou Kyuusei Uranai (Japan).nes', '0-9'),
+        ('[BIOS] Famicom Disk System (Japan).nes', '_BIOS'),
+        ('Super Mario Bros. (World).nes', 'Sp-Sz'),
+        ('S.C.A.T. - Special Cybernetic Attack Team (USA).nes', 'Sa-So'),
+        ('Mega Man (USA).NES', 'Ma-Me'),
+        ('Mega Man (USA).sav', None),
+        ('Mz (USA).nes', None),
+        ])
+def test_classify_iregex(name, dir_name):
+    assert Buckets(get_profile('nes')).classify(name) == dir_name
+
+@pytest.mark.parametrize(('name', 'dir_name'), [
+        ('Tetris (World).gb', 'T'),
+        ('tetris (World).GB', 'T'),
+        ('Super Mario Land (World).gb', 'Sp-Sz'),
+        ('Sagaia (Japan).gb', 'Sa-So'),
+        ('4-in-1 Fun Pak (USA).gb', '0-9'),
+        ('[BIOS] Nintendo Game Boy Boot ROM (World).gb', '_BIOS'),
+        ('\'s Heaven (Japan).gb', None),
+        ])
+def test_classify_iname(name, dir_name):
+    assert Buckets(get_profile('gb')).classify(name) == dir_name
+
+def test_unknown_bucket_match():
+    profile = get_profile('gb')
+    with pytest.raises(ValueError):
+        Buckets(type(profile)(**{**profile.__dict__, 'bucket_match': 'regex'}))
+
+def find_buckets(path, profile) -> dict:
+    '''Classify the files in the path with find(1), like the shell scripts of the baseline: name to bucket.'''
+
+    buckets = {}
+
+    for (dir_name, pattern) in profile.dir_name_to_pattern.items():
+        if profile.bucket_match == 'iname':
+            test = ['-iname', pattern]
+        else:
+            test = ['-regextype', 'posix-extended', '-iregex', pattern]
+        output = subprocess.run(['find', '.', '-maxdepth', '1', '-type', 'f', *test, '-print0'],
+                cwd=path, stdout=subprocess.PIPE, check=True).stdout
+        for name in filter(None, output.split(b'\0')):
+            # The first bucket that matches wins, as in the organizer.
+            buckets.setdefault(os.fsdecode(name)[2:], dir_name)
+
+    return buckets
+
+@pytest.mark.skipif(shutil.which('find') is None, reason='needs find(1)')
+@pytest.mark.parametrize('profile_name', sorted(PROFILES))
+def test_classify_like_find(tmp_path, profile_name):
+    profile = get_profile(profile_name)
+    names = (roms_list_dir / fixtures[profile_name]).read_text(encoding='utf-8').splitlines()
+    for name in names:
+        (tmp_path / name).touch()
+
+    expected = find_buckets(tmp_path, profile)
+
+    buckets = Buckets(profile)
+    actual = {name: dir_name for name in names if (dir_name := buckets.classify(name)) is not None}
+
+    assert actual == expected
@@ -0,0 +1,67 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+# pylint: disable=missing-function-docstring
+
+'''
+Tests of the catalog: an incremental run plans like a full run.
+'''
+
+import os
+import zipfile
+
+from organize_roms.catalog import Catalog
+from organize_roms.engine import organize, rules_for
+from organize_roms.profiles import get_profile
+from organize_roms.zips import inner_names, zip_classifier
+
+def full_plan(path, profile):
+    names = os.listdir(path)
+    classify = zip_classifier(rules_for(profile).buckets, profile.rom_ext, inner_names(path, names, profile.rom_ext))
+    return organize(names, profile, classify)
+
+def rescan(catalog, path, profile):
+    # Change the mtime of the directory, so it is read again.
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns - 10_000_000_000))
+    return catalog.plan(path, profile)
+
+def same_plan(a, b) -> bool:
+    return (a.deletions, a.renames, a.moves, a.unplaced) == (b.deletions, b.renames, b.moves, b.unplaced)
+
+def test_superseded_file_comes_back(tmp_path):
+    profile = get_profile('nes')
+    roms_dir = tmp_path / 'roms'
+    roms_dir.mkdir()
+    for name in ('Foo (USA).nes', 'Foo (Japan).nes', 'Bar (USA).nes'):
+        (roms_dir / name).touch()
+
+    with Catalog(tmp_path / 'catalog.db') as catalog:
+        catalog.plan(roms_dir, profile)
+        os.unlink(roms_dir / 'Foo (USA).nes')
+        plan = rescan(catalog, roms_dir, profile)
+
+    assert 'Foo (Japan).nes' in plan.moves['E-F']
+    assert same_plan(plan, full_plan(roms_dir, profile))
+
+def test_zip_archives(tmp_path):
+    profile = get_profile('nes')
+    roms_dir = tmp_path / 'roms'
+    roms_dir.mkdir()
+    for stem in ('Alpha (USA)', 'Tetris (World)', 'Foo (USA)', 'Foo (Japan)'):
+        with zipfile.ZipFile(roms_dir / f'{stem}.zip', 'w') as zf:
+            zf.writestr(f'Inner {stem}.nes', b'')
+    (roms_dir / 'broken.zip').write_bytes(b'not a zip')
+
+    with Catalog(tmp_path / 'catalog.db') as catalog:
+        plan = catalog.plan(roms_dir, profile)
+        assert same_plan(plan, full_plan(roms_dir, profile))
+        assert plan.moves['I-J'] == ['Alpha (USA).zip', 'Foo (USA).zip', 'Tetris (World).zip']
+        assert plan.unplaced == ['broken.zip']
+
+        os.unlink(roms_dir / 'Foo (USA).zip')
+        plan = rescan(catalog, roms_dir, profile)
+        assert same_plan(plan, full_plan(roms_dir, profile))
+        assert 'Foo (Japan).zip' in plan.moves['I-J']
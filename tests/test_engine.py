@@ -0,0 +1,155 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+# pylint: disable=missing-function-docstring
+
+'''
+Tests of the removal phases of the organizer and of the tag rules they use.
+'''
+
+import dataclasses
+import fnmatch
+import functools
+from pathlib import Path
+
+import pytest
+
+from organize_roms.engine import TagRule, organize, supersede
+from organize_roms.names import parse
+from organize_roms.profiles import PROFILES, get_profile
+
+roms_list_dir = Path(__file__).resolve().parent.parent / 'roms-list'
+
+def parsed(names) -> dict:
+    return {name: parse(name) for name in names}
+
+def test_supersede():
+    roms = parsed([
+            'Foo (USA).nes',
+            'Foo (Europe).nes',
+            'Foo (Japan).nes',
+            'Foo (Japan) (Rev 1).nes',
+            'Bar (Europe).nes',
+            'Bar (Japan).nes',
+            'Baz (Japan, USA).nes',
+            'Baz (Japan).nes',
+            'Qux (USA) (Beta).nes',
+            'Qux (Germany).nes',
+            ])
+
+    assert supersede(roms, 'USA', ('Europe', 'Japan')) == {
+            'Foo (Europe).nes',
+            'Foo (Japan).nes',
+            'Foo (Japan) (Rev 1).nes',
+            'Baz (Japan).nes',
+            }
+
+    # A ROM of the preferred region is never removed, even if it is also of a territory.
+    assert 'Baz (Japan, USA).nes' not in supersede(roms, 'USA', ('Japan',))
+
+    assert supersede(roms, 'Europe', ('Japan',)) == {'Foo (Japan).nes', 'Foo (Japan) (Rev 1).nes', 'Bar (Japan).nes'}
+
+def test_supersede_first_region():
+    # Only the first region of a ROM makes it a ROM of a territory.
+    roms = parsed(['Foo (USA).nes', 'Foo (Europe, Japan).nes', 'Foo (Germany, Japan).nes'])
+    assert supersede(roms, 'USA', ('Europe', 'Japan')) == {'Foo (Europe, Japan).nes'}
+
+def deleted(plan) -> dict:
+    return {deletion.comment: deletion.names for deletion in plan.deletions}
+
+def test_organize_phases():
+    names = [
+            'Foo (USA).nes',
+            'Foo (Europe).nes',
+            'Foo (USA) (Beta).nes',
+            'Bar (Germany).nes',
+            'Bar (Japan).nes',
+            'Bar (Europe).nes',
+            '[BIOS] Famicom Disk System (Japan).nes',
+            '[BIOS] Famicom Disk System (Japan) (Proto).nes',
+            ]
+
+    plan = organize(names, get_profile('nes'))
+
+    assert deleted(plan) == {
+            '# ROMs matching glob patterns of development status': [
+                    'Foo (USA) (Beta).nes', '[BIOS] Famicom Disk System (Japan) (Proto).nes'],
+            '# ROMs matching glob patterns of territory': ['Bar (Germany).nes'],
+            '# Europe, Japan ROMs with an equivalent USA version': ['Foo (Europe).nes'],
+            }
+    # BIOS files are kept after phase 1, but are not counted as kept ROMs.
+    assert plan.kept == {'Foo (USA).nes', 'Bar (Japan).nes', 'Bar (Europe).nes'}
+    assert plan.moves['_BIOS'] == ['[BIOS] Famicom Disk System (Japan).nes']
+    assert plan.moves['B'] == ['Bar (Europe).nes', 'Bar (Japan).nes']
+    assert plan.moves['E-F'] == ['Foo (USA).nes']
+
+def test_organize_supersede_japan_with_europe():
+    profile = dataclasses.replace(get_profile('nes'), supersede_japan_with_europe=True)
+    names = ['Bar (Japan).nes', 'Bar (Europe).nes', 'Foo (Japan).nes', 'Foo (Japan, USA).nes', 'Foo (Europe).nes']
+
+    plan = organize(names, profile)
+
+    assert deleted(plan) == {
+            '# Europe, Japan ROMs with an equivalent USA version': ['Foo (Europe).nes', 'Foo (Japan).nes'],
+            '# Japan ROMs with an equivalent Europe version': ['Bar (Japan).nes'],
+            }
+
+def test_organize_ext_renames():
+    plan = organize(['Sonic (USA, Europe).bin', 'Taken (USA).bin', 'Taken (USA).md'], get_profile('md-gen'))
+
+    # An existing file is not overwritten.
+    assert plan.renames == [('Sonic (USA, Europe).bin', 'Sonic (USA, Europe).md')]
+    assert 'Sonic (USA, Europe).md' in plan.moves['Sa-So']
+
+def test_tag_rule_nested_prefixes():
+    rule = TagRule(('*(Proto*', '*(Prototype*', '*(Beta*'))
+
+    rom = parse('Foo (USA) (Prototype 2).nes')
+    assert rule(rom)
+    # The longest prefix is matched, and every glob pattern it implies is hit.
+    assert rule.hits(rom) == {'*(Proto*', '*(Prototype*'}
+
+    assert rule.hits(parse('Foo (USA) (Proto).nes')) == {'*(Proto*'}
+    assert rule.hits(parse('Foo (USA) (Beta) (Proto).nes')) == {'*(Beta*', '*(Proto*'}
+
+    # Only the start of a tag is matched.
+    assert not rule(parse('Foo (USA) (Not Beta).nes'))
+    assert not rule(parse('Beta Foo (USA).nes'))
+
+def test_tag_rule_other_globs():
+    rule = TagRule(('*(Beta*', '*[b]*', 'Foo*'))
+
+    assert rule.hits(parse('Foo (USA).nes')) == {'Foo*'}
+    assert rule.hits(parse('Bar (USA) [b].nes')) == {'*[b]*'}
+    assert rule.hits(parse('Foo (USA) (Beta).nes')) == {'*(Beta*', 'Foo*'}
+    assert not rule(parse('Bar (USA).nes'))
+
+def test_tag_rule_empty():
+    rule = TagRule(())
+    assert not rule(parse('Foo (USA) (Beta).nes'))
+    assert rule.select(parsed(['Foo (USA) (Beta).nes']), {}) == set()
+
+@functools.cache
+def fixture_roms() -> dict:
+    roms = {}
+    for path in roms_list_dir.glob('[A-Z]*'):
+        roms.update(parsed(path.read_text(encoding='utf-8').splitlines()))
+    return roms
+
+@pytest.mark.parametrize('glob_patterns', sorted(
+        {profile.glob_patterns_dev_status for profile in PROFILES.values()} |
+        {profile.glob_patterns_territory for profile in PROFILES.values()}))
+def test_tag_rule_like_fnmatch(glob_patterns):
+    roms = fixture_roms()
+    rule = TagRule(glob_patterns)
+    counts = dict.fromkeys(glob_patterns, 0)
+
+    selected = rule.select(roms, counts)
+
+    # the names that match each glob pattern
+    expected = {glob_pattern: set(fnmatch.filter(roms, glob_pattern)) for glob_pattern in glob_patterns}
+    assert selected == set().union(*expected.values())
+    assert counts == {glob_pattern: len(names) for (glob_pattern, names) in expected.items()}
+    assert rule.select(roms) == selected
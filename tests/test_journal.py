@@ -0,0 +1,72 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+# pylint: disable=missing-function-docstring
+
+'''
+Tests of resuming and undoing a journaled run after a failure.
+'''
+
+import os
+
+import pytest
+
+from organize_roms.apply import run_operations
+from organize_roms.journal import Journal, resume, undo
+
+from test_apply import make_files, move_ops, names, run_with_timeout
+
+def begin(tmp_path, ops) -> Journal:
+    journal = Journal(tmp_path / 'run.journal')
+    journal.begin(str(tmp_path / 'roms'), ops)
+    return journal
+
+@pytest.mark.parametrize('jobs', [1, 8])
+def test_resume_after_error(tmp_path, jobs):
+    roms_dir = tmp_path / 'roms'
+    roms_dir.mkdir()
+    make_files(roms_dir, names)
+    missing = names[123]
+    os.unlink(roms_dir / missing)
+    ops = move_ops(names)
+    failed = ops.index(('move', missing, missing[0]))
+
+    with begin(tmp_path, ops) as journal:
+        with pytest.raises(FileNotFoundError):
+            run_with_timeout(lambda: run_operations(ops, roms_dir, journal=journal, jobs=jobs))
+
+    journal = Journal.load(tmp_path / 'run.journal')
+    assert journal.state == 'running'
+    # The progress is committed up to the operation that failed.
+    assert journal.committed == failed
+
+    (roms_dir / missing).touch()
+
+    with journal:
+        counts = run_with_timeout(lambda: resume(journal, jobs=jobs))
+
+    assert counts['moved'] == len(ops) - failed - sum(op[0] == 'mkdir' for op in ops[failed:])
+    assert Journal.load(tmp_path / 'run.journal').state == 'finished'
+    assert sorted(os.listdir(roms_dir)) == list('ABCDEFGH')
+    assert sum(len(os.listdir(roms_dir / dir_name)) for dir_name in 'ABCDEFGH') == len(names)
+
+@pytest.mark.parametrize('jobs', [1, 8])
+def test_undo(tmp_path, jobs):
+    roms_dir = tmp_path / 'roms'
+    roms_dir.mkdir()
+    make_files(roms_dir, names)
+    ops = move_ops(names)
+
+    with begin(tmp_path, ops) as journal:
+        run_with_timeout(lambda: run_operations(ops, roms_dir, journal=journal, jobs=jobs))
+
+    journal = Journal.load(tmp_path / 'run.journal')
+    assert journal.state == 'finished'
+
+    with journal:
+        counts = undo(journal)
+
+    assert counts == {'restored': len(names), 'rmdir': 8, 'lost': 0}
+    assert sorted(os.listdir(roms_dir)) == names
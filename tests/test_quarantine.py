@@ -0,0 +1,72 @@
+# SPDX-FileCopyrightText: Steven Ward
+# SPDX-License-Identifier: OSL-3.0
+
+# pylint: disable=bad-indentation
+# pylint: disable=invalid-name
+# pylint: disable=missing-function-docstring
+
+'''
+Tests of quarantining the removed files, and of restoring, purging and undoing a run.
+'''
+
+import os
+
+from organize_roms.apply import apply_plan
+from organize_roms.engine import organize
+from organize_roms.journal import Journal, undo
+from organize_roms.profiles import get_profile
+from organize_roms.quarantine import list_runs, load_manifest, prepare, purge_run, restore_run
+
+names = ['Foo (USA).nes', 'Foo (Europe).nes', 'Foo (USA) (Beta).nes', 'Bar (Germany).nes', 'Bar (Japan).nes']
+removed = ['Foo (USA) (Beta).nes', 'Bar (Germany).nes', 'Foo (Europe).nes']
+
+def quarantine(roms_dir, journal = None) -> str:
+    for name in names:
+        (roms_dir / name).write_bytes(b'rom')
+    plan = organize(os.listdir(roms_dir), get_profile('nes'))
+    (run_dir, usage) = prepare(plan, roms_dir)
+    assert sum(record['files'] for record in usage) == len(removed)
+    apply_plan(plan, roms_dir, journal=journal, quarantine_dir=run_dir)
+    return os.path.basename(run_dir)
+
+def test_quarantine_and_restore(tmp_path):
+    run = quarantine(tmp_path)
+
+    assert list_runs(tmp_path) == [run]
+    assert sorted(os.listdir(tmp_path / '.quarantine' / run)) == sorted(removed + ['.manifest.json'])
+    assert load_manifest(tmp_path, run)['platform'] == 'nes'
+
+    # A file that exists again is kept in quarantine.
+    (tmp_path / 'Bar (Germany).nes').touch()
+    assert restore_run(tmp_path, run) == {'restored': 2, 'kept': 1}
+    assert list_runs(tmp_path) == [run]
+
+    os.unlink(tmp_path / 'Bar (Germany).nes')
+    assert restore_run(tmp_path, run) == {'restored': 1, 'kept': 0}
+    assert list_runs(tmp_path) == []
+    assert set(removed) <= set(os.listdir(tmp_path))
+
+def test_purge(tmp_path):
+    run = quarantine(tmp_path)
+
+    assert purge_run(tmp_path, run)['files'] == len(removed)
+    assert list_runs(tmp_path) == []
+    assert not set(removed) & set(os.listdir(tmp_path))
+
+def test_undo(tmp_path):
+    roms_dir = tmp_path / 'roms'
+    roms_dir.mkdir()
+
+    with Journal(tmp_path / 'run.journal') as journal:
+        # begin is called by apply_plan
+        quarantine(roms_dir, journal)
+
+    journal = Journal.load(tmp_path / 'run.journal')
+    with journal:
+        counts = undo(journal)
+
+    # the files moved into buckets and the files quarantined
+    assert counts['restored'] == len(names)
+    # The run left with only its manifest is removed too.
+    assert list_runs(roms_dir) == []
+    assert sorted(name for name in os.listdir(roms_dir) if not name.startswith('.')) == sorted(names)